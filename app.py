@@ -1,16 +1,22 @@
 import os
 import sys
 import re
+import math
+import time
 import dash
-import itertools
 import dash_table
-import pandas as pd
-import plotly.graph_objs as go
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State, ClientsideFunction
+from dash.exceptions import PreventUpdate
 from dash_table.Format import Format, Scheme, Sign, Symbol
+import su_metrics
+from flask import jsonify, request, g
+from su_cache import make_cache, memoize
+from su_quote import make_batcher, parse_job
+from su_metrics import timed, instrument
+from su_core import catalog, su_dollar, top_resource, node_rates, su_cost, su_budget, su_cost_batch, su_workflow
 
 # Initiate the app ----------------------------------------------------------------
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.FLATLY])
@@ -50,9 +56,13 @@ readme_content = dcc.Markdown(
   * `Amount of RAM (GB)`: amount of RAM to reserve in gigabytes PER NODE.
   * `Job duration (hours)`: how long your job will last in hours 
   *  You can return your cost in units of dollars or Service Units.
-  * `View`: given a price of a job, predict future costs if you run that job multiple times OR predict cost of multiple multi-day jobs
+  * `Budget`: the largest jobs you can run for that many SUs or dollars. The CPU, GPU and RAM fields are used as minimums, and every node type (or the selected one) is listed for up to 12 node counts from 1 to `Number of nodes` with the most resources per node and the longest run time the budget allows. Enter the budget again after changing the job.
+  * `Add to workflow`: adds the job above as a row of the workflow table, so a pipeline of different jobs (e.g. many small standard-node steps, a fat-node assembly and a GPU training stage) is priced together. Edit the cells or delete rows in place. `Jobs` is how many times the row's job runs, and rows with the same `Stage` name are summed in the per-stage breakdown under the table.
+  * `What-if sweep` (below the table): SUs over every combination of the listed CPUs, GPUs, RAM and hours on the checked node types. Values are `start:stop`, `start:stop:step` or a list such as `4,8,16`. Two axes are drawn as a heatmap (or one line per Y value), and the other axes are held at the sidebar job. Press `Sweep` to draw it, and again after changing the sidebar job.
+  * `View`: given a price of a job, predict future costs if you run that job multiple times OR predict cost of multiple multi-day jobs. Choose `Whole workflow` to project the total of the workflow table instead of the sidebar job.
     * Note: clicking the `View` button once will show how time and number of jobs affects job cost. Click it again to close the graph and table.
     * Note: It is best not to change computing parameters while the graph is open because it will calculate a new matrix for every change in parameter.
+    * Note: the table shows 100 rows per page. Click a column header to sort, or type a condition such as `>= 1000` in the filter row under the header.
 * It is not informative to put negative numbers into the app.
 
 # Example Calculations
@@ -110,11 +120,8 @@ sidebar = html.Div(
                 dbc.Label("Select type of node"),
                 dbc.Select(
                     id="node_type",
-                    options=[
-                        {'label': 'Standard', 'value': 'std'},
-                        {'label': 'GPU', 'value': 'gpu'},
-                        {'label': 'High-Memory', 'value': 'fat'}
-                        ])]),
+                    options=[{'label': label, 'value': node_id} for node_id, label in catalog.labels.items()]
+                    )]),
             dbc.FormGroup([
                 dbc.Label("Number of nodes"),
                 dbc.Input(
@@ -164,7 +171,28 @@ sidebar = html.Div(
                     {"label": "Dollars", "value": "units_dollars"}
                 ]),
             html.Hr(),
+            dbc.FormGroup([
+                dbc.Label("Budget (in the units above)"),
+                dbc.Input(
+                    id="input_budget",
+                    type="number",
+                    debounce=True,
+                    min=0,
+                    placeholder="largest job for a budget")]),
+            dbc.Label("Price several jobs together"),
+            dbc.Button(
+                "Add to workflow",
+                id="input_workflow_add",
+                color = "primary"),
+            html.Hr(),
             dbc.Label("View effects of frequency and time"),
+            dbc.RadioItems(
+                id="input_view_source",
+                value="job",
+                options=[
+                    {"label": "Sidebar job", "value": "job"},
+                    {"label": "Whole workflow", "value": "workflow"}
+                ]),
             dbc.Button(
                 "View",
                 id="input_view",
@@ -184,6 +212,24 @@ sidebar = html.Div(
 
 content = html.Div(id="page-content", style=CONTENT_STYLE)
 
+# node types, rates and grid sizes for the browser callbacks (SU_CALLBACKS=client). The data is filled in below the calculator settings.
+config_store = dcc.Store(id="calculator_config")
+
+# columns of the workflow table. Each row is one job shape, repeated "Jobs" times, and rows with the same stage name are summed.
+workflow_columns = [
+    {"name": "Stage", "id": "stage"},
+    {"name": "Node type", "id": "node_type", "presentation": "dropdown"},
+    {"name": "Nodes", "id": "node_count", "type": "numeric"},
+    {"name": "CPUs", "id": "cpu", "type": "numeric"},
+    {"name": "GPUs", "id": "gpu", "type": "numeric"},
+    {"name": "RAM (GB)", "id": "ram", "type": "numeric"},
+    {"name": "Hours", "id": "duration", "type": "numeric"},
+    {"name": "Jobs", "id": "count", "type": "numeric"}]
+
+# axes of the what-if sweep (su_sweep.AXES). Axes that are not plotted are held at the sidebar values.
+sweep_axis_labels = {"node_type": "Node type", "cpu": "CPUs per node", "gpu": "GPUs per node", "ram": "RAM per node (GB)", "duration": "Job duration (hours)"}
+sweep_axis_options = [{"label": label, "value": axis} for axis, label in sweep_axis_labels.items()]
+
 # app layout ----------------------------------------------------------------------
 app.layout = html.Div([
     # title
@@ -203,6 +249,38 @@ app.layout = html.Div([
         ), align="center",
     ),
 
+    # largest jobs that fit the budget
+    dbc.Row(
+        dbc.Col(
+            dash_table.DataTable(
+                id='output_budget',
+                style_as_list_view = True,
+                style_header = {'backgroundColor': 'white', 'fontWeight': 'bold'}),
+        width={"size": 6, "offset": 4}
+        ), align="center",
+    ),
+
+    # workflow: job rows (editable) and their cost per stage
+    dbc.Row(
+        dbc.Col([
+            dash_table.DataTable(
+                id='input_workflow',
+                columns = workflow_columns,
+                data = [],
+                editable = True,
+                row_deletable = True,
+                dropdown = {'node_type': {'options': [{'label': label, 'value': node_id} for node_id, label in catalog.labels.items()]}},
+                style_as_list_view = True,
+                style_header = {'backgroundColor': 'white', 'fontWeight': 'bold'}),
+            dbc.Alert(id = "output_workflow_total", children = [], color="success", style = {"text-align": "center"}, is_open = False),
+            dash_table.DataTable(
+                id='output_workflow',
+                style_as_list_view = True,
+                style_header = {'backgroundColor': 'white', 'fontWeight': 'bold'})],
+        width={"size": 6, "offset": 4}
+        ), align="center",
+    ),
+
     # graph cost over time
     dbc.Row(
         dbc.Col(
@@ -220,6 +298,9 @@ app.layout = html.Div([
             dcc.Loading(children=[
                 dash_table.DataTable(
                     id='output_table', 
+                    page_action = "custom", page_current = 0, page_size = 100,
+                    sort_action = "custom", sort_mode = "multi", sort_by = [],
+                    filter_action = "custom", filter_query = "",
                     style_table = {"width": "100%", "height": "75vh", "overflowY": "auto"}, 
                     style_as_list_view = True,
                     style_header = {'backgroundColor': 'white', 'fontWeight': 'bold'})
@@ -228,8 +309,41 @@ app.layout = html.Div([
         ), align="center",
     ),
 
-    # cached information - cost of job
-    html.Div(id='intermediate_cost', style={'display': 'none'})
+    # what-if sweep over node type, resources and duration
+    dbc.Row(
+        dbc.Col([
+            html.H4("What-if sweep"),
+            dbc.Row([
+                dbc.Col(dbc.FormGroup([dbc.Label("CPUs"), dbc.Input(id="sweep_cpu", value="1:28", debounce=True)])),
+                dbc.Col(dbc.FormGroup([dbc.Label("GPUs"), dbc.Input(id="sweep_gpu", value="0:4", debounce=True)])),
+                dbc.Col(dbc.FormGroup([dbc.Label("RAM (GB)"), dbc.Input(id="sweep_ram", value="4,8,16,32,64,128,256,512,1024", debounce=True)])),
+                dbc.Col(dbc.FormGroup([dbc.Label("Hours"), dbc.Input(id="sweep_duration", value="1:48", debounce=True)])),
+            ]),
+            dbc.Row([
+                dbc.Col(dbc.FormGroup([dbc.Label("Node types"), dbc.Checklist(
+                    id="sweep_node_types",
+                    options=[{'label': label, 'value': node_id} for node_id, label in catalog.labels.items()],
+                    value=list(catalog.ids),
+                    inline=True)])),
+                dbc.Col(dbc.FormGroup([dbc.Label("X axis"), dbc.Select(id="sweep_x", options=sweep_axis_options, value="ram")])),
+                dbc.Col(dbc.FormGroup([dbc.Label("Y axis"), dbc.Select(id="sweep_y", options=sweep_axis_options, value="node_type")])),
+                dbc.Col(dbc.FormGroup([dbc.Label("Chart"), dbc.RadioItems(
+                    id="sweep_chart",
+                    value="heatmap",
+                    options=[{"label": "Heatmap", "value": "heatmap"}, {"label": "Lines", "value": "lines"}],
+                    inline=True)])),
+                dbc.Col(dbc.Button("Sweep", id="input_sweep", color="primary")),
+            ]),
+            dcc.Graph(id='output_sweep')],
+        width={"size": 6, "offset": 4}
+        ), align="center",
+    ),
+
+    # cached information - cost of the sidebar job, of the workflow, and the one projected by View
+    html.Div(id='intermediate_job_cost', style={'display': 'none'}),
+    html.Div(id='intermediate_workflow_cost', style={'display': 'none'}),
+    html.Div(id='intermediate_cost', style={'display': 'none'}),
+    config_store
     ]
 )
 
@@ -240,23 +354,38 @@ app.layout = html.Div([
 # set a graph into a dcc.Loading children to get a loading screen.
 
 # vars and f(x) -------------------------------------------------------------------
-su_dollar = 0.025 # number of dollars per service unit
-# note: total gpu units in a node is hard-coded as 4 below. Introduce a tot_gpu option if hardware changes in the future.
-
-# define top resource used
-def top_resource(alloc_CPU, cpu_denominator, alloc_GPU, gpu_denominator, alloc_RAM, ram_denominator):
-    return( max([alloc_CPU / cpu_denominator, alloc_GPU / gpu_denominator, alloc_RAM / ram_denominator]) )
+# numpy, pandas and plotly.graph_objs are imported inside the functions that use them, so workers boot without loading them.
+grid_days = 32 # cost_table() grid size shown by the View button
+grid_jobs = 101
+# "surface" draws the closed-form cost surface on a regular (decimated) grid. "mesh" is the original Mesh3d over every table row.
+graph_mode = os.environ.get("SU_GRAPH_MODE", "surface")
+graph_max_points = 10000 # the surface is decimated above this many grid points
+sweep_max_points = 100000 # the sweep heatmap/lines are decimated above this many cells
+sweep_max_lines = 50 # lines drawn by the sweep line chart
+sweep_max_share_cells = 10 ** 6 # node type/cpu/gpu/ram combinations of one sweep, far below su_sweep.py's command line limit since every worker caches a few cubes
+budget_max_rows = 12 # node counts listed per node type by the budget table
+# "server" runs the callbacks below in python. "client" runs them in the browser (assets/clientside.js), so the server only hands out the page and config_store
+# and builds the what-if sweep, which needs numpy.
+callback_mode = os.environ.get("SU_CALLBACKS", "server")
+table_columns = [{"name": i, "id": i, "type": "numeric", "format": Format(precision=4)} for i in ['Number of Days', 'Total Number of Jobs', 'Cost']]
 
 # calculate cost of job over time and frequency
-def cost_table(est_cost, max_days = 32, max_freq = 101, units = "units_su"):
+def cost_table(est_cost, max_days = 32, max_freq = 101, units = "units_su", rows = None):
     """ 
     Input: cost of job
     Output: a plot of job cost over time (x) and frequency (y)
+    The grid is built as one outer product (days are the outer loop, number of jobs the inner loop) instead of appending row by row.
+    Pass rows (positions in the full table) to only compute those rows, e.g. one page of the table.
     """
-    df_surface = pd.DataFrame(columns=['Number of Days', 'Total Number of Jobs'])
-    for i in itertools.product(pd.Series(range(1, max_days)), pd.Series(range(1, max_freq))):
-        temp_row = pd.Series(list(i), index=['Number of Days', 'Total Number of Jobs'])
-        df_surface = df_surface.append(temp_row, ignore_index=True)
+    import numpy as np
+    import pandas as pd
+    if rows is None:
+        days, freq = np.meshgrid(np.arange(1, max_days), np.arange(1, max_freq), indexing = "ij")
+        days, freq = days.ravel(), freq.ravel()
+    else:
+        days, freq = np.divmod(np.asarray(rows), max_freq - 1)
+        days, freq = days + 1, freq + 1
+    df_surface = pd.DataFrame({'Number of Days': days, 'Total Number of Jobs': freq})
     if units == "units_su":
         df_surface = df_surface.assign(Cost = df_surface['Number of Days'] * df_surface['Total Number of Jobs'] * est_cost)
     elif units == "units_dollars":
@@ -265,40 +394,209 @@ def cost_table(est_cost, max_days = 32, max_freq = 101, units = "units_su"):
         print("incorrect unit type. Must be 'units_su' or 'units_dollars'. ")
     return(df_surface)
 
-def su_cost(node_type, node_count, cpu, gpu, ram, duration):
+def decimate(values, max_count):
+    """ keep every n-th value so at most about max_count remain. The last value is always kept so the axis range does not shrink. """
+    if len(values) <= max_count:
+        return(values)
+    stride = -(-len(values) // max_count)
+    import numpy as np
+    return(np.unique(np.append(values[::stride], values[-1])))
+
+def cost_surface(est_cost, max_days = 32, max_freq = 101, units = "units_su", max_points = None):
+    """
+    Input: cost of job
+    Output: days (x), number of jobs (y) and a len(y) x len(x) cost matrix (z) of the same values as cost_table(), ready for go.Surface.
+    With max_points, both axes are decimated so the matrix has at most about max_points cells.
+    """
+    import numpy as np
+    days = np.arange(1, max_days)
+    freq = np.arange(1, max_freq)
+    if max_points is not None and len(days) * len(freq) > max_points:
+        ratio = (max_points / (len(days) * len(freq))) ** 0.5
+        days = decimate(days, max(2, int(len(days) * ratio)))
+        freq = decimate(freq, max(2, int(len(freq) * ratio)))
+    cost = np.outer(freq, days) * est_cost
+    if units == "units_dollars":
+        cost = cost * su_dollar
+    return(days, freq, cost)
+
+# operators of the DataTable filter row, e.g. "{Cost} >= 100 && {Number of Days} < 7"
+filter_operators = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '=']]
+
+def split_filter_part(filter_part):
+    """ split one filter expression into (column, pandas operator name, value). """
+    for operator_type in filter_operators:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+                value = value_part.strip().strip("'\"`")
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+                return(name, operator_type[0].strip(), value)
+    return(None, None, None)
+
+def cost_table_page(est_cost, page_current, page_size, sort_by = None, filter_query = "", max_days = 32, max_freq = 101, units = "units_su"):
+    """
+    Output: one page of cost_table() as a list of records, and the number of pages.
+    Without sorting or filtering only the rows of the requested page are computed.
     """
-    Calculates SU but only utilized for unit tests because different conda environments cannot use the app callback function as a standalone function.
-    This is the exact same method used to get to SU calculations, but the output format is much more friendly for unit tests. This fx omits button clicks and dollar units.
+    import numpy as np
+    total = (max_days - 1) * (max_freq - 1)
+    if not sort_by and not filter_query:
+        page_count = max(1, -(-total // page_size))
+        page_current = min(page_current, page_count - 1)
+        start = page_current * page_size
+        with timed("table_page.cost_table"):
+            tbl = cost_table(est_cost, max_days, max_freq, units, rows = np.arange(start, min(start + page_size, total)))
+        with timed("table_page.to_dict"):
+            return(tbl.to_dict('records'), page_count)
+    with timed("table_page.cost_table"):
+        tbl = cost_table(est_cost, max_days, max_freq, units)
+    with timed("table_page.filter_sort"):
+        for filter_part in (filter_query or "").split(' && '):
+            col_name, operator, filter_value = split_filter_part(filter_part)
+            if col_name in tbl.columns and isinstance(filter_value, float):
+                tbl = tbl.loc[getattr(tbl[col_name], operator)(filter_value)]
+        if sort_by:
+            tbl = tbl.sort_values(
+                [col['column_id'] for col in sort_by],
+                ascending = [col['direction'] == 'asc' for col in sort_by])
+    page_count = max(1, -(-len(tbl) // page_size))
+    page_current = min(page_current, page_count - 1)
+    with timed("table_page.to_dict"):
+        return(tbl.iloc[page_current * page_size: (page_current + 1) * page_size].to_dict('records'), page_count)
+
+# callback caches -----------------------------------------------------------------
+# popular inputs (e.g. 1 std node, 1 cpu, 4 GB) are served from an LRU cache instead of being recomputed. See su_cache.py for the SU_CACHE* settings.
+calc_cost_cache = make_cache("calc_cost")
+table_graph_cache = make_cache("table_graph")
+sweep_cache = make_cache("sweep", maxsize = 4) # a cube holds up to 8 MB (sweep_max_share_cells), so only a few are kept
+
+def number(value):
+    """ normalize numeric inputs so 1, 1.0 and "1" share a cache entry. """
+    return(None if value is None else float(value))
+
+# every key starts with catalog.version, so entries of the filesystem cache from before a rate change are never served
+def calc_cost_key(node_type, node_count, cpu, gpu, ram, duration, units):
+    if node_type == None:
+        return(None)
+    return(catalog.version, node_type, number(node_count), number(cpu), number(gpu), number(ram), number(duration), units)
+
+def table_graph_key(price, units, n_click):
+    if n_click == None or n_click % 2 == 0: # closed view is cheap
+        return(None)
+    return(catalog.version, number(price), units, grid_days, grid_jobs, graph_mode)
+
+@server.route("/cache_stats")
+def cache_stats():
+    return(jsonify(calc_cost = calc_cost_cache.stats(), table_graph = table_graph_cache.stats(), sweep = sweep_cache.stats()))
+
+# instrumentation -----------------------------------------------------------------
+# with SU_METRICS=1 every callback, its stages and its HTTP response (including Dash's JSON encoding) are timed. See su_metrics.py.
+callback_names = {} # "id.property" of a callback's first output -> callback name
+
+def first_output(outputs):
+    output = outputs[0] if isinstance(outputs, (list, tuple)) else outputs
+    if isinstance(output, dict): # as sent in the request body
+        return("{}.{}".format(output["id"], output["property"]))
+    return("{}.{}".format(output.component_id, output.component_property))
+
+@server.before_request
+def start_timer():
+    if su_metrics.enabled:
+        g.request_start = time.perf_counter()
+
+@server.after_request
+def record_response(response):
+    if su_metrics.enabled and request.path == "/_dash-update-component" and "request_start" in g:
+        body = request.get_json(silent = True) or {}
+        name = callback_names.get(first_output(body.get("outputs", {"id": "", "property": ""})), "unknown")
+        su_metrics.record(name + ".response", time.perf_counter() - g.request_start, size = response.calculate_content_length())
+    return(response)
+
+@server.route("/metrics")
+def metrics():
+    report = su_metrics.snapshot()
+    report["cache"] = {"calc_cost": calc_cost_cache.stats(), "table_graph": table_graph_cache.stats(), "sweep": sweep_cache.stats()}
+    report["quote"] = quote_batcher.stats()
+    return(jsonify(report))
+
+# pricing API ---------------------------------------------------------------------
+# JSON quotes for scripts, the portal and the SLURM job_submit plugin. Concurrent requests are costed together, see su_quote.py.
+quote_batcher = make_batcher()
+
+def quote_response(su):
+    return({"su": su, "dollars": su * su_dollar})
+
+@server.route("/api/quote", methods = ["GET", "POST"])
+def quote():
+    """
+    GET /api/quote?node_type=std&cpu=14&ram=32&duration=10, POST one job object, or POST {"jobs": [...]} (or a bare list) for a batch.
+    A batch returns {"quotes": [...], "su": total, "dollars": total}. Errors are returned as {"error": message} with status 400.
     """
-    if node_type == 'std':
-        node_factor = 1
-        tot_cpu = 28
-        tot_ram = 128
-    if node_type == 'gpu':
-        node_factor = 2
-        tot_cpu = 28
-        tot_ram = 256
-    if node_type == 'fat':
-        node_factor = 6
-        tot_cpu = 56
-        tot_ram = 1024
-    # job_setup = "current setup = {} node type + {} number of nodes + {} number of cpu # + {} number of ram + {} hrs duration of job + {} total cpu + {} total ram".format(node_type, node_count, cpu, ram, duration, tot_cpu, tot_ram)
-    # calculate service units
-    max_resource = top_resource(
-        alloc_CPU = cpu, cpu_denominator = tot_cpu,
-        alloc_GPU = gpu, gpu_denominator = 4,
-        alloc_RAM = ram, ram_denominator = tot_ram)
-    su = ( (node_count * (max_resource * node_factor)) * 28 * duration )
-    return(su)
-
-# Service Units Equation = SUM over allocated nodes(max(AllocCPU/TotCPU, AllocRAM/TotRAM, AllocGRES/TotGRES) * NTF) * 28 Service Units/hour * job duration in hours
+    body = request.args.to_dict() if request.method == "GET" else request.get_json(silent = True)
+    single = isinstance(body, dict) and "jobs" not in body
+    specs = [body] if single else (body.get("jobs") if isinstance(body, dict) else body)
+    if not isinstance(specs, list) or not specs:
+        return(jsonify(error = "expected a job object, a list of jobs or {\"jobs\": [...]}"), 400)
+    try:
+        jobs = [parse_job(spec) for spec in specs]
+    except ValueError as error:
+        return(jsonify(error = str(error)), 400)
+    with timed("quote.su_cost_batch"):
+        su = quote_batcher.quote(jobs)
+    # huge but finite inputs can overflow, and Infinity is not valid JSON
+    total = sum(su)
+    if not math.isfinite(total * su_dollar):
+        overflow = [position for position, job_su in enumerate(su) if not math.isfinite(job_su * su_dollar)]
+        message = "the cost of job {} is too large to represent".format(overflow[0]) if overflow else "the total cost is too large to represent"
+        return(jsonify(error = message), 400)
+    if single:
+        return(jsonify(rate_version = catalog.version, **quote_response(su[0])))
+    return(jsonify(rate_version = catalog.version, quotes = [quote_response(job_su) for job_su in su], **quote_response(total)))
 
 # app callbacks -------------------------------------------------------------------
 
+config_store.data = {
+    "rates": catalog.rates,
+    "su_per_node_hour": catalog.su_per_node_hour,
+    "su_dollar": su_dollar,
+    "grid_days": grid_days,
+    "grid_jobs": grid_jobs,
+    "graph_max_points": graph_max_points,
+    "table_columns": [column["id"] for column in table_columns],
+    "table_format": Format(precision=4).to_plotly_json(),
+    "ids": list(catalog.ids),
+    "labels": catalog.labels,
+    "totals": catalog.totals,
+    "budget_max_rows": budget_max_rows,
+}
+
+def plain_columns(columns):
+    """ DataTable columns with their Format objects turned into plain dicts for config_store. """
+    return([dict(column, format = column["format"].to_plotly_json()) if "format" in column else column for column in columns])
+
+def callback(outputs, inputs, state = (), *, clientside = None):
+    """
+    Register a python callback, or with SU_CALLBACKS=client the function named clientside in assets/clientside.js.
+    The browser version receives config_store as an extra argument after the states.
+    """
+    def decorator(fx):
+        if callback_mode == "client" and clientside is not None:
+            app.clientside_callback(ClientsideFunction("su_calculator", clientside), outputs, inputs, list(state) + [State("calculator_config", "data")])
+            return(fx)
+        callback_names[first_output(outputs)] = fx.__name__
+        return(app.callback(outputs, inputs, list(state))(instrument(fx.__name__)(fx)))
+    return(decorator)
+
 # readme callback
-@app.callback(
+@callback(
     Output("output_readme", "is_open"),
-    [Input("input_readme", "n_clicks")]
+    [Input("input_readme", "n_clicks")],
+    clientside = "readme"
 )
 def readme(n_click):
     if n_click == None:
@@ -307,10 +605,10 @@ def readme(n_click):
         return(True)
 
 # determine SU price requested
-@app.callback(
+@callback(
     [Output("output_su", 'children'),
     Output("output_su", "is_open"),
-    Output("intermediate_cost", "children")],
+    Output("intermediate_job_cost", "children")],
     [Input('node_type', 'value'),
     Input('node_count', 'value'),
     Input('input_cpu', 'value'),
@@ -318,33 +616,15 @@ def readme(n_click):
     Input('input_ram', 'value'),
     Input('job_duration', 'value'),
     Input('input_units', 'value')], 
+    clientside = "calc_cost"
 )
+@memoize(calc_cost_cache, calc_cost_key)
 def calc_cost(node_type, node_count, cpu, gpu, ram, duration, units):
      # do not return anything if no user input
     if node_type == None:
-        table_data = [] # empty table
-        table_columns = []
-        fig = go.Figure(data=[go.Mesh3d(x=[],y=[],z=[])])
         return(None, False, None)
-        pass
-    # adjust NTF, total RAM, total CPU by node type
-    if node_type == 'std':
-        node_factor = 1
-        tot_cpu = 28
-        tot_ram = 128
-    if node_type == 'gpu':
-        node_factor = 2
-        tot_cpu = 28
-        tot_ram = 256
-    if node_type == 'fat':
-        node_factor = 6
-        tot_cpu = 56
-        tot_ram = 1024
-    max_resource = top_resource(
-        alloc_CPU = cpu, cpu_denominator = tot_cpu,
-        alloc_GPU = gpu, gpu_denominator = 4,
-        alloc_RAM = ram, ram_denominator = tot_ram)
-    su = ( (node_count * (max_resource * node_factor)) * 28 * duration )
+    with timed("calc_cost.su_cost"):
+        su = su_cost(node_type, node_count, cpu, gpu, ram, duration)
     # adjust output msg by units selected
     if units == "units_su":
         est_cost  = "estimated service units: {}".format(round(su, 2))
@@ -352,63 +632,276 @@ def calc_cost(node_type, node_count, cpu, gpu, ram, duration, units):
         est_cost = "estimated cost in dollars: ${}".format(round(su * su_dollar, 2))
     return(est_cost, True, su)
 
+def cost_figure(price, units, mode = "surface"):
+    """ figure of job cost over days and number of jobs, drawn as a regular go.Surface or as the original per-point go.Mesh3d. """
+    import plotly.graph_objs as go
+    if mode == "mesh":
+        tbl = cost_table(price, max_days = grid_days, max_freq = grid_jobs, units = units)
+        return(go.Figure(
+            data=[go.Mesh3d(z=tbl['Cost'], 
+            x=tbl['Number of Days'], 
+            y = tbl['Total Number of Jobs'], 
+            opacity=1, 
+            intensity=tbl['Cost'], 
+            colorscale="Inferno")]))
+    days, freq, cost = cost_surface(price, max_days = grid_days, max_freq = grid_jobs, units = units, max_points = graph_max_points)
+    return(go.Figure(data=[go.Surface(x=days, y=freq, z=cost, colorscale="Inferno")]))
+
+# largest jobs for a budget, using the sidebar resources as minimums
+budget_columns = [
+    {"name": "Node type", "id": "node_type"},
+    {"name": "Nodes", "id": "node_count", "type": "numeric"},
+    {"name": "CPUs per node", "id": "cpu", "type": "numeric"},
+    {"name": "GPUs per node", "id": "gpu", "type": "numeric"},
+    {"name": "RAM per node (GB)", "id": "ram", "type": "numeric", "format": Format(precision=4)},
+    {"name": "Max hours", "id": "hours", "type": "numeric", "format": Format(precision=4)},
+    {"name": "Max hours on whole nodes", "id": "hours_full_node", "type": "numeric", "format": Format(precision=4)}]
+config_store.data["budget_columns"] = plain_columns(budget_columns)
+
+def budget_node_counts(node_count, max_rows = budget_max_rows):
+    """ 1 to node_count nodes, or max_rows geometrically spaced counts from 1 to node_count. Hours only scale with 1 / nodes, so a few rows show the trade-off. """
+    last = max(1, int(node_count or 1))
+    if last <= max_rows:
+        return(list(range(1, last + 1)))
+    return(sorted({int(round(last ** (step / (max_rows - 1)))) for step in range(max_rows - 1)} | {last}))
+
+@callback(
+    [Output("output_budget", "data"),
+    Output("output_budget", "columns")],
+    [Input('input_budget', 'value')],
+    [State('node_type', 'value'),
+    State('node_count', 'value'),
+    State('input_cpu', 'value'),
+    State('input_gpu', 'value'),
+    State('input_ram', 'value'),
+    State('input_units', 'value')],
+    clientside = "budget_plan"
+)
+def budget_plan(budget, node_type, node_count, cpu, gpu, ram, units):
+    # the sidebar job is read when the budget is entered. Without a budget there is nothing to do, unless the field was just cleared.
+    if budget == None and "input_budget.value" not in [trigger["prop_id"] for trigger in dash.callback_context.triggered]:
+        raise PreventUpdate
+    if budget == None or budget <= 0 or not (cpu or gpu or ram):
+        return([], [])
+    plans = su_budget(budget, units, node_type = node_type, min_cpu = cpu or 0, min_gpu = gpu or 0, min_ram = ram or 0, node_counts = budget_node_counts(node_count))
+    for plan in plans:
+        plan["node_type"] = catalog.labels[plan["node_type"]]
+    return(plans, budget_columns)
+
+# append the sidebar job to the workflow table. Its rows can then be edited or deleted in place.
+@callback(
+    Output("input_workflow", "data"),
+    [Input('input_workflow_add', 'n_clicks')],
+    [State('input_workflow', 'data'),
+    State('node_type', 'value'),
+    State('node_count', 'value'),
+    State('input_cpu', 'value'),
+    State('input_gpu', 'value'),
+    State('input_ram', 'value'),
+    State('job_duration', 'value')],
+    clientside = "add_workflow_job"
+)
+def add_workflow_job(n_click, rows, node_type, node_count, cpu, gpu, ram, duration):
+    rows = list(rows or [])
+    if n_click == None or node_type == None:
+        return(rows)
+    rows.append({"stage": "stage {}".format(len(rows) + 1), "node_type": node_type, "node_count": node_count, "cpu": cpu, "gpu": gpu, "ram": ram, "duration": duration, "count": 1})
+    return(rows)
+
+workflow_fields = ('node_count', 'cpu', 'gpu', 'ram', 'duration', 'count')
+
+def workflow_jobs(rows):
+    """ workflow table rows that can be costed: a known node type and a number in every resource cell (empty cells count as 0, an empty Jobs cell as 1). """
+    jobs = []
+    for row in rows or []:
+        if row.get("node_type") not in catalog.index:
+            continue
+        job = {"stage": row.get("stage"), "node_type": row["node_type"]}
+        try:
+            for field in workflow_fields:
+                value = row.get(field)
+                job[field] = float(value) if value not in (None, "") else (1.0 if field == "count" else 0.0)
+        except (TypeError, ValueError):
+            continue
+        jobs.append(job)
+    return(jobs)
+
+workflow_stage_columns = [
+    {"name": "Stage", "id": "stage"},
+    {"name": "Jobs", "id": "jobs", "type": "numeric"},
+    {"name": "Cost", "id": "cost", "type": "numeric", "format": Format(precision=4)},
+    {"name": "Share of total (%)", "id": "percent", "type": "numeric", "format": Format(precision=3)}]
+config_store.data["workflow_stage_columns"] = plain_columns(workflow_stage_columns)
+
+# cost every workflow row in one batch and break the total down by stage
+@callback(
+    [Output("output_workflow", "data"),
+    Output("output_workflow", "columns"),
+    Output("output_workflow_total", "children"),
+    Output("output_workflow_total", "is_open"),
+    Output("intermediate_workflow_cost", "children")],
+    [Input('input_workflow', 'data'),
+    Input('input_units', 'value')],
+    clientside = "workflow_cost"
+)
+def workflow_cost(rows, units):
+    jobs = workflow_jobs(rows)
+    if not jobs:
+        return([], [], None, False, 0.0)
+    with timed("workflow_cost.su_workflow"):
+        su, stages, total = su_workflow(jobs)
+    scale = su_dollar if units == "units_dollars" else 1
+    breakdown = [{"stage": stage["stage"], "jobs": stage["jobs"], "cost": stage["su"] * scale, "percent": stage["share"] * 100} for stage in stages]
+    if units == "units_dollars":
+        message = "estimated workflow cost in dollars: ${}".format(round(total * su_dollar, 2))
+    else:
+        message = "estimated workflow service units: {}".format(round(total, 2))
+    return(breakdown, workflow_stage_columns, message, True, total)
+
+# price projected by View: the sidebar job or the total of the whole workflow
+@callback(
+    Output("intermediate_cost", "children"),
+    [Input('intermediate_job_cost', 'children'),
+    Input('intermediate_workflow_cost', 'children'),
+    Input('input_view_source', 'value')],
+    clientside = "view_price"
+)
+def view_price(job_price, workflow_price, source):
+    return(workflow_price if source == "workflow" else job_price)
+
 # retrieve the intermediate price and create frequency and time table+graph
-@app.callback(
-    [Output("output_table", "data"),
-    Output("output_table", "columns"),
+@callback(
+    [Output("output_table", "columns"),
     Output("output_graph", "figure")],
     [Input('intermediate_cost', 'children'),
     Input('input_units', 'value'),
-    Input('input_view', 'n_clicks')]
+    Input('input_view', 'n_clicks')],
+    clientside = "table_graph"
 )
+@memoize(table_graph_cache, table_graph_key)
 def table_graph(price, units, n_click):
+    import plotly.graph_objs as go
     if n_click == None or n_click % 2 == 0:
-        table_data = [] # empty table
-        table_columns = []
         fig = go.Figure(data=[go.Mesh3d(x=[],y=[],z=[])])
-        return(table_data, table_columns, fig)
+        return([], fig) # empty table
     elif (n_click % 2 == 1):
-        # build the table. data and styling goes here! Format() is a lifesaver.
-        tbl = cost_table(price, units = units)
-        table_data = tbl.to_dict('records')
-        table_columns = [{"name": i, "id": i, "type": "numeric", "format": Format(precision=4)} for i in tbl.columns]
+        # the table styling is in table_columns. Format() is a lifesaver. The rows are sent one page at a time by table_page().
         # build the graph. data and styling goes here!
-        fig = go.Figure(
-            data=[go.Mesh3d(z=tbl['Cost'], 
-            x=tbl['Number of Days'], 
-            y = tbl['Total Number of Jobs'], 
-            opacity=1, 
-            intensity=tbl['Cost'], 
-            colorscale="Inferno")])
-        fig.update_layout(
-            title="Job cost over time and number of jobs",
-            scene = dict(
-            xaxis_title="Number of Days (X)",
-            yaxis_title="Total Number of Jobs (Y)",
-            zaxis_title="Cost (Z)"))
-    return(table_data, table_columns, fig)
+        with timed("table_graph.figure"):
+            fig = cost_figure(price, units, graph_mode)
+            fig.update_layout(
+                title="Job cost over time and number of jobs",
+                scene = dict(
+                xaxis_title="Number of Days (X)",
+                yaxis_title="Total Number of Jobs (Y)",
+                zaxis_title="Cost (Z)"))
+        with timed("table_graph.to_dict"):
+            fig = fig.to_dict() # plain dict is cheaper to cache and serialize
+    return(table_columns, fig)
+
+# serve the visible page of the table. paging, sorting and filtering happen here instead of in the browser.
+@callback(
+    [Output("output_table", "data"),
+    Output("output_table", "page_count")],
+    [Input('intermediate_cost', 'children'),
+    Input('input_units', 'value'),
+    Input('input_view', 'n_clicks'),
+    Input('output_table', 'page_current'),
+    Input('output_table', 'page_size'),
+    Input('output_table', 'sort_by'),
+    Input('output_table', 'filter_query')],
+    clientside = "table_page"
+)
+def table_page(price, units, n_click, page_current, page_size, sort_by, filter_query):
+    if n_click == None or n_click % 2 == 0:
+        return([], 1)
+    return(cost_table_page(price, page_current or 0, page_size, sort_by, filter_query, max_days = grid_days, max_freq = grid_jobs, units = units))
+
+# what-if sweep. The cube only depends on the swept values, so changing the plotted axes or the sidebar job re-slices the cached cube.
+# the sidebar job is read when the Sweep button is pressed, so editing the sidebar does not redraw the sweep on every keystroke.
+@memoize(sweep_cache, lambda *axes: (catalog.version,) + axes)
+def sweep_cube(node_types, cpu, gpu, ram, duration, node_count):
+    from su_sweep import SweepCube
+    return(SweepCube(node_types, cpu, gpu, ram, duration, node_count, max_cells = sweep_max_share_cells))
+
+def sweep_strides(x_count, y_count, max_points):
+    """ steps along x and y that keep at most max_points cells. The axis with more remaining points is thinned first. """
+    x_step, y_step = 1, 1
+    while -(-x_count // x_step) * -(-y_count // y_step) > max_points:
+        if -(-x_count // x_step) >= -(-y_count // y_step):
+            x_step *= 2
+        else:
+            y_step *= 2
+    return(x_step, y_step)
+
+def sweep_message(message):
+    return({"data": [], "layout": {"title": message, "xaxis": {"visible": False}, "yaxis": {"visible": False}}})
+
+@callback(
+    Output("output_sweep", "figure"),
+    [Input('sweep_node_types', 'value'),
+    Input('sweep_cpu', 'value'),
+    Input('sweep_gpu', 'value'),
+    Input('sweep_ram', 'value'),
+    Input('sweep_duration', 'value'),
+    Input('sweep_x', 'value'),
+    Input('sweep_y', 'value'),
+    Input('sweep_chart', 'value'),
+    Input('input_sweep', 'n_clicks')],
+    [State('node_type', 'value'),
+    State('node_count', 'value'),
+    State('input_cpu', 'value'),
+    State('input_gpu', 'value'),
+    State('input_ram', 'value'),
+    State('job_duration', 'value'),
+    State('input_units', 'value')]
+)
+def sweep_figure(node_types, cpu_axis, gpu_axis, ram_axis, duration_axis, x, y, chart, n_click, node_type, node_count, cpu, gpu, ram, duration, units):
+    from su_sweep import AXES, parse_axis
+    if n_click == None: # nothing is drawn until the Sweep button is pressed
+        raise PreventUpdate
+    if not node_types:
+        return(sweep_message("Select at least one node type"))
+    if x == y:
+        return(sweep_message("Pick two different axes"))
+    node_types = tuple(node_id for node_id in catalog.ids if node_id in node_types)
+    try:
+        with timed("sweep_figure.cube"):
+            cube = sweep_cube(node_types, parse_axis(cpu_axis), parse_axis(gpu_axis), parse_axis(ram_axis), parse_axis(duration_axis), number(node_count) or 1.0)
+    except (ValueError, MemoryError) as error:
+        return(sweep_message(str(error) or "sweep too large"))
+    # hold the axes that are not plotted at the sidebar job (the nearest swept value)
+    sidebar = {"node_type": node_type if node_type in node_types else node_types[0], "cpu": cpu or 0, "gpu": gpu or 0, "ram": ram or 0, "duration": duration or 0}
+    fixed = {axis: cube.position(axis, sidebar[axis]) for axis in AXES if axis not in (x, y)}
+    # thin the plotted axes before slicing so the figure stays small
+    y_count = len(cube.axes[y])
+    y_step = -(-y_count // sweep_max_lines) if chart == "lines" else 1
+    x_step, y_thinning = sweep_strides(len(cube.axes[x]), -(-y_count // y_step), sweep_max_points)
+    y_step *= y_thinning
+    plotted = {x: slice(None, None, x_step), y: slice(None, None, y_step)}
+    with timed("sweep_figure.slice"):
+        z = cube.slice(units, **fixed, **plotted)
+        if AXES.index(x) < AXES.index(y):
+            z = z.T # rows are y values
+    x_values, y_values = [[catalog.labels[value] for value in cube.axes[axis][plotted[axis]]] if axis == "node_type" else cube.axes[axis][plotted[axis]].tolist() for axis in (x, y)]
+    held = ", ".join("{} = {}".format(sweep_axis_labels[axis], catalog.labels[cube.axes[axis][position]] if axis == "node_type" else "{:g}".format(cube.axes[axis][position])) for axis, position in fixed.items())
+    cost_title = "Cost ($)" if units == "units_dollars" else "Service units"
+    if chart == "lines":
+        data = [{"type": "scatter", "mode": "lines", "x": x_values, "y": row.tolist(), "name": "{}: {}".format(sweep_axis_labels[y], value)} for value, row in zip(y_values, z)]
+        layout = {"xaxis": {"title": sweep_axis_labels[x]}, "yaxis": {"title": cost_title}}
+    else:
+        data = [{"type": "heatmap", "x": x_values, "y": y_values, "z": z.tolist(), "colorscale": "Inferno", "colorbar": {"title": cost_title}}]
+        layout = {"xaxis": {"title": sweep_axis_labels[x]}, "yaxis": {"title": sweep_axis_labels[y]}}
+    layout["title"] = "{} cells swept. {}".format(cube.size, held)
+    if x_step > 1 or y_step > 1:
+        layout["title"] += " Thinned to every {} x and every {} y value.".format(x_step, y_step)
+    return({"data": data, "layout": layout})
 
 # if you want an empty table, just return an empty list [] for output table's (data and columns) component id.
 
 # unit tests ----------------------------------------------------------------------
 
-# Example 1 (CPU driven SU): User A submits a job that is allocated 14 cores and 32 GB of RAM on one standard compute node.  Each compute node has a total of 28 cores and 128GB of RAM.  The job runs for 10 hours.  The job would have consumed
-assert su_cost('std', 1, 14, 0, 32, 10) == 140.0, "1 standard node using 14 cores and 28 GB RAM for 10 hrs does not equal 140 service units"
-
-# Example 2 (Memory driven SU): User B submits a job that is allocated 7 cores and 128GB of RAM and one GPU on a GPU node. Each GPU node has a total of 28 cores and 256GB of RAM and 4 GPUs.  The job runs for 10 hours. Then the job would have consumed
-assert su_cost('std', 1, 7, 1, 128, 10) == 280.0, "1 standard node using 7 cores and 128 GB RAM for 10 hrs does not equal 280 service units" # accommodate one gpu core
-
-# Example 3 (GPU driven SU): User C submits a job to the GPU partition and that job is allocated 1 core, 16GB of RAM, and 3 GPUs. The nodes in the GPU partition have 28 cpus, 256 GB of RAM, and 4 GPUs. This job runs for 10 hours and will have consumed
-assert su_cost('gpu', 1, 1, 3, 16, 10) == 420.0, "1 standard node using 7 cores and 128 GB RAM for 10 hrs does not equal 280 service units" # accommodate one gpu core
-
-# Example 4 (CPU driven SU on Fat nodes): User D submits a job to the fat partition that is allocated 42 of the 56 available cpus and 512GB of memory.  The job finishes in 10 hours and will have consumed
-assert su_cost('fat', 1, 42, 0, 512, 10) == 1260, "1 fat node using 42 cores and 512 GB RAM for 10 hrs does not equal 1260 service units"
-
-# Example 5 (Memory driven SU on Fat nodes): User E submits a job to the fat partition that is allocated 4 of the 56 available cpus and 2TB (2048GB) of memory.  The job finishes in 10 hours and will have consumed
-assert su_cost('fat', 1, 4, 0, 2048, 10) == 3360.0, "1 fat node using 4 cores and 2048 GB RAM for 10 hrs does not equal 3360 service units"
-
-# Example 6 (Multiple standard nodes): User F submits a job that is allocated 16 standard nodes (28 cores and 128 GB of RAM per node, totaling 448 cores and 2048GB of memory).  The job runs for 10 hours and will have consumed
-assert su_cost('std', 16, 28, 0, 128, 10) == 4480.0, "16 std nodes using 28 cores and 128 GB RAM for 10 hrs does not equal 4480 service units"
+# the README examples are checked in test_su_core.py (python -m pytest), so importing the app does not run them.
 
 # run app --------------------------------------------------------------------------
 
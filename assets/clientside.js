@@ -0,0 +1,287 @@
+/*
+Browser versions of the callbacks in app.py, used when the app is started with SU_CALLBACKS=client.
+They follow the python functions of the same name. config is the calculator_config store (node type rates, grid sizes and table format).
+*/
+
+// python's round(x, 2) as shown in the alert, e.g. 140.0 or 3.5
+function pyRound(value) {
+    var rounded = Math.round(value * 100) / 100;
+    return Number.isInteger(rounded) ? rounded.toFixed(1) : String(rounded);
+}
+
+// keep every n-th value so at most about maxCount remain, always keeping the last value
+function decimate(values, maxCount) {
+    if (values.length <= maxCount) {
+        return values;
+    }
+    var stride = Math.ceil(values.length / maxCount);
+    var kept = values.filter(function (value, i) { return i % stride === 0; });
+    if (kept[kept.length - 1] !== values[values.length - 1]) {
+        kept.push(values[values.length - 1]);
+    }
+    return kept;
+}
+
+function range(start, stop) {
+    var values = [];
+    for (var i = start; i < stop; i++) {
+        values.push(i);
+    }
+    return values;
+}
+
+function unitCost(price, units, config) {
+    return units === "units_dollars" ? price * config.su_dollar : price;
+}
+
+// cost_table() rows for the given positions of the full table
+function tableRows(price, units, config, rows) {
+    var nJobs = config.grid_jobs - 1;
+    var cost = unitCost(price, units, config);
+    var names = config.table_columns;
+    return rows.map(function (row) {
+        var record = {};
+        var days = Math.floor(row / nJobs) + 1;
+        var jobs = (row % nJobs) + 1;
+        record[names[0]] = days;
+        record[names[1]] = jobs;
+        record[names[2]] = days * jobs * cost;
+        return record;
+    });
+}
+
+// budget_node_counts() in app.py: 1 to nodeCount, or maxRows geometrically spaced counts from 1 to nodeCount
+function budgetNodeCounts(nodeCount, maxRows) {
+    var last = Math.max(1, Math.trunc(nodeCount || 1));
+    if (last <= maxRows) {
+        return range(1, last + 1);
+    }
+    var counts = [last];
+    for (var step = 0; step < maxRows - 1; step++) {
+        counts.push(Math.round(Math.pow(last, step / (maxRows - 1))));
+    }
+    return counts.filter(function (count, i) { return counts.indexOf(count) === i; }).sort(function (a, b) { return a - b; });
+}
+
+// su_budget() in su_core.py for a list of node counts, with node type labels instead of ids
+function suBudget(budget, units, nodeType, minCpu, minGpu, minRam, nodeCounts, config) {
+    var budgetSu = units === "units_dollars" ? budget / config.su_dollar : budget;
+    var plans = [];
+    (nodeType == null ? config.ids : [nodeType]).forEach(function (nodeId) {
+        var rates = config.rates[nodeId]; // [node factor, 1 / total cpu, 1 / total gpu, 1 / total ram]
+        var totals = config.totals[nodeId]; // [cpu, gpu, ram] installed
+        var share = Math.max(minCpu * rates[1], minGpu * rates[2], minRam * rates[3]);
+        if (share > 1 || minGpu > totals[1]) {
+            return;
+        }
+        var nodeHour = share * rates[0] * config.su_per_node_hour;
+        nodeCounts.forEach(function (nodeCount) {
+            plans.push({
+                node_type: config.labels[nodeId],
+                node_count: nodeCount,
+                cpu: Math.max(minCpu, Math.floor(share * totals[0] + 1e-9)),
+                gpu: Math.max(minGpu, Math.floor(share * totals[1] + 1e-9)),
+                ram: Math.max(minRam, share * totals[2]),
+                node_share: share,
+                hours: budgetSu / (nodeCount * nodeHour),
+                hours_full_node: budgetSu / (nodeCount * rates[0] * config.su_per_node_hour)
+            });
+        });
+    });
+    return plans;
+}
+
+var workflowFields = ["node_count", "cpu", "gpu", "ram", "duration", "count"];
+
+// workflow_jobs() in app.py: rows with a known node type and a number in every resource cell
+function workflowJobs(rows, config) {
+    var jobs = [];
+    (rows || []).forEach(function (row) {
+        if (!config.rates.hasOwnProperty(row.node_type)) {
+            return;
+        }
+        var job = {stage: row.stage, node_type: row.node_type};
+        for (var i = 0; i < workflowFields.length; i++) {
+            var field = workflowFields[i];
+            var value = row[field];
+            job[field] = value == null || value === "" ? (field === "count" ? 1 : 0) : Number(value);
+            if (isNaN(job[field])) {
+                return;
+            }
+        }
+        jobs.push(job);
+    });
+    return jobs;
+}
+
+var filterOperators = [["ge ", ">="], ["le ", "<="], ["lt ", "<"], ["gt ", ">"], ["ne ", "!="], ["eq ", "="]];
+var compare = {
+    ge: function (a, b) { return a >= b; },
+    le: function (a, b) { return a <= b; },
+    lt: function (a, b) { return a < b; },
+    gt: function (a, b) { return a > b; },
+    ne: function (a, b) { return a !== b; },
+    eq: function (a, b) { return a === b; }
+};
+
+// same as split_filter_part() in app.py
+function splitFilterPart(filterPart) {
+    for (var i = 0; i < filterOperators.length; i++) {
+        for (var j = 0; j < filterOperators[i].length; j++) {
+            var operator = filterOperators[i][j];
+            var at = filterPart.indexOf(operator);
+            if (at !== -1) {
+                var namePart = filterPart.slice(0, at);
+                var value = filterPart.slice(at + operator.length).trim().replace(/^['"`]+|['"`]+$/g, "");
+                return [namePart.slice(namePart.indexOf("{") + 1, namePart.lastIndexOf("}")), filterOperators[i][0].trim(), value];
+            }
+        }
+    }
+    return [null, null, null];
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    su_calculator: {
+        readme: function (nClick) {
+            return nClick != null && nClick % 2 === 1;
+        },
+
+        calc_cost: function (nodeType, nodeCount, cpu, gpu, ram, duration, units, config) {
+            if (nodeType == null) {
+                return [null, false, null];
+            }
+            var rates = config.rates[nodeType]; // [node factor, 1 / total cpu, 1 / total gpu, 1 / total ram]
+            var maxResource = Math.max(cpu * rates[1], gpu * rates[2], ram * rates[3]);
+            var su = (nodeCount * (maxResource * rates[0])) * config.su_per_node_hour * duration;
+            var estCost = units === "units_dollars" ?
+                "estimated cost in dollars: $" + pyRound(su * config.su_dollar) :
+                "estimated service units: " + pyRound(su);
+            return [estCost, true, su];
+        },
+
+        budget_plan: function (budget, nodeType, nodeCount, cpu, gpu, ram, units, config) {
+            var triggered = dash_clientside.callback_context.triggered.map(function (trigger) { return trigger.prop_id; });
+            if (budget == null && triggered.indexOf("input_budget.value") === -1) {
+                throw dash_clientside.PreventUpdate;
+            }
+            if (budget == null || budget <= 0 || !(cpu || gpu || ram)) {
+                return [[], []];
+            }
+            var plans = suBudget(budget, units, nodeType, cpu || 0, gpu || 0, ram || 0, budgetNodeCounts(nodeCount, config.budget_max_rows), config);
+            return [plans, config.budget_columns];
+        },
+
+        add_workflow_job: function (nClick, rows, nodeType, nodeCount, cpu, gpu, ram, duration) {
+            rows = (rows || []).slice();
+            if (nClick == null || nodeType == null) {
+                return rows;
+            }
+            rows.push({stage: "stage " + (rows.length + 1), node_type: nodeType, node_count: nodeCount, cpu: cpu, gpu: gpu, ram: ram, duration: duration, count: 1});
+            return rows;
+        },
+
+        workflow_cost: function (rows, units, config) {
+            var jobs = workflowJobs(rows, config);
+            if (jobs.length === 0) {
+                return [[], [], null, false, 0.0];
+            }
+            var scale = units === "units_dollars" ? config.su_dollar : 1;
+            var stages = [];
+            var byName = {};
+            var total = 0;
+            jobs.forEach(function (job) {
+                var rates = config.rates[job.node_type];
+                var maxResource = Math.max(job.cpu * rates[1], job.gpu * rates[2], job.ram * rates[3]);
+                var su = (job.node_count * (maxResource * rates[0])) * config.su_per_node_hour * job.duration * job.count;
+                var name = String(job.stage || "");
+                if (!byName.hasOwnProperty(name)) {
+                    byName[name] = {stage: name, jobs: 0, su: 0};
+                    stages.push(byName[name]);
+                }
+                byName[name].jobs += job.count;
+                byName[name].su += su;
+                total += su;
+            });
+            var breakdown = stages.map(function (stage) {
+                return {stage: stage.stage, jobs: stage.jobs, cost: stage.su * scale, percent: total ? stage.su / total * 100 : 0};
+            });
+            var message = units === "units_dollars" ?
+                "estimated workflow cost in dollars: $" + pyRound(total * config.su_dollar) :
+                "estimated workflow service units: " + pyRound(total);
+            return [breakdown, config.workflow_stage_columns, message, true, total];
+        },
+
+        view_price: function (jobPrice, workflowPrice, source) {
+            return source === "workflow" ? workflowPrice : jobPrice;
+        },
+
+        table_graph: function (price, units, nClick, config) {
+            if (nClick == null || nClick % 2 === 0) {
+                return [[], {data: [{type: "mesh3d", x: [], y: [], z: []}]}];
+            }
+            var columns = config.table_columns.map(function (name) {
+                return {name: name, id: name, type: "numeric", format: config.table_format};
+            });
+            var days = range(1, config.grid_days);
+            var jobs = range(1, config.grid_jobs);
+            if (days.length * jobs.length > config.graph_max_points) {
+                var ratio = Math.sqrt(config.graph_max_points / (days.length * jobs.length));
+                days = decimate(days, Math.max(2, Math.floor(days.length * ratio)));
+                jobs = decimate(jobs, Math.max(2, Math.floor(jobs.length * ratio)));
+            }
+            var cost = unitCost(price, units, config);
+            var z = jobs.map(function (job) {
+                return days.map(function (day) { return job * day * cost; });
+            });
+            var figure = {
+                data: [{type: "surface", x: days, y: jobs, z: z, colorscale: "Inferno"}],
+                layout: {
+                    title: {text: "Job cost over time and number of jobs"},
+                    scene: {
+                        xaxis: {title: {text: "Number of Days (X)"}},
+                        yaxis: {title: {text: "Total Number of Jobs (Y)"}},
+                        zaxis: {title: {text: "Cost (Z)"}}
+                    }
+                }
+            };
+            return [columns, figure];
+        },
+
+        table_page: function (price, units, nClick, pageCurrent, pageSize, sortBy, filterQuery, config) {
+            if (nClick == null || nClick % 2 === 0) {
+                return [[], 1];
+            }
+            var total = (config.grid_days - 1) * (config.grid_jobs - 1);
+            var page = pageCurrent || 0;
+            var pageCount;
+            if ((!sortBy || sortBy.length === 0) && !filterQuery) {
+                pageCount = Math.max(1, Math.ceil(total / pageSize));
+                page = Math.min(page, pageCount - 1);
+                return [tableRows(price, units, config, range(page * pageSize, Math.min((page + 1) * pageSize, total))), pageCount];
+            }
+            var records = tableRows(price, units, config, range(0, total));
+            (filterQuery || "").split(" && ").forEach(function (filterPart) {
+                var parts = splitFilterPart(filterPart);
+                var value = parseFloat(parts[2]);
+                if (config.table_columns.indexOf(parts[0]) !== -1 && !isNaN(value)) {
+                    records = records.filter(function (record) { return compare[parts[1]](record[parts[0]], value); });
+                }
+            });
+            if (sortBy && sortBy.length > 0) {
+                records.sort(function (a, b) {
+                    for (var i = 0; i < sortBy.length; i++) {
+                        var column = sortBy[i].column_id;
+                        if (a[column] !== b[column]) {
+                            var order = a[column] < b[column] ? -1 : 1;
+                            return sortBy[i].direction === "asc" ? order : -order;
+                        }
+                    }
+                    return 0;
+                });
+            }
+            pageCount = Math.max(1, Math.ceil(records.length / pageSize));
+            page = Math.min(page, pageCount - 1);
+            return [records.slice(page * pageSize, (page + 1) * pageSize), pageCount];
+        }
+    }
+});
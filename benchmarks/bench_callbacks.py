@@ -0,0 +1,49 @@
+"""
+End-to-end timing of the Dash callbacks: calc_cost, table_graph and table_page are POSTed to the Flask server in process,
+so the timings include Dash's argument handling and the JSON encoding of the figure and table. Response sizes are reported too.
+The callback cache is switched off unless --cache is given.
+Usage: python benchmarks/bench_callbacks.py [--repeat 20] [--cache]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+from dash_requests import CALLBACK_URL, calc_cost_request, table_graph_request, table_page_request
+
+CASES = [
+    ("calc_cost", calc_cost_request()),
+    ("table_graph", table_graph_request()),
+    ("table_page", table_page_request()),
+    ("table_page (sorted)", table_page_request(sort_by = [{"column_id": "Cost", "direction": "desc"}])),
+    ("table_page (filtered)", table_page_request(filter_query = "{Cost} >= 1000 && {Number of Days} < 7")),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type = int, default = 20, help = "requests per callback")
+    parser.add_argument("--cache", action = "store_true", help = "keep the callback cache on (SU_CACHE from the environment)")
+    args = parser.parse_args()
+    if not args.cache:
+        os.environ["SU_CACHE"] = "off"
+
+    import app
+    client = app.server.test_client()
+    client.get("/") # let Dash build its index and dependency list first
+    print("{:<24} {:>12} {:>12} {:>14}".format("callback", "median (ms)", "max (ms)", "response (kB)"))
+    for name, body in CASES:
+        client.post(CALLBACK_URL, json = body) # warm up: the first call also imports pandas/plotly
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = client.post(CALLBACK_URL, json = body)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.data[:200]
+        print("{:<24} {:>12.2f} {:>12.2f} {:>14.1f}".format(name, statistics.median(timings) * 1000, max(timings) * 1000, len(response.data) / 1024))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Micro-benchmarks of the SU formula and the cost table: top_resource, su_cost, su_cost_batch and cost_table at several grid sizes.
+Usage: python benchmarks/bench_core.py [--repeat 5]
+"""
+import os
+import sys
+import timeit
+import argparse
+import platform
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# (max_days, max_freq) pairs. Grid size is (max_days - 1) * (max_freq - 1) cells.
+GRID_SIZES = [(32, 101), (101, 1001), (1001, 1001)]
+BATCH_SIZES = [1000, 1000000]
+
+def report(name, statement, setup, repeat):
+    timer = timeit.Timer(statement, setup = setup)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat = repeat, number = number)) / number
+    unit, scale = ("us", 1e6) if best < 1e-3 else ("ms", 1e3)
+    print("{:<40} {:>12.3f} {}".format(name, best * scale, unit))
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type = int, default = 5, help = "number of timing runs, the best run is reported")
+    args = parser.parse_args()
+
+    import numpy
+    import pandas
+    print("python {}, numpy {}, pandas {}".format(platform.python_version(), numpy.__version__, pandas.__version__))
+    report("top_resource", "top_resource(14, 28, 0, 4, 32, 128)", "from su_core import top_resource", args.repeat)
+    report("su_cost", "su_cost('std', 1, 14, 0, 32, 10)", "from su_core import su_cost", args.repeat)
+    for size in BATCH_SIZES:
+        setup = "\n".join([
+            "import numpy as np",
+            "from su_core import su_cost_batch",
+            "rng = np.random.default_rng(0)",
+            "jobs = (rng.choice(['std', 'gpu', 'fat'], {0}), rng.integers(1, 16, {0}), rng.integers(1, 56, {0}), rng.integers(0, 4, {0}), rng.uniform(1, 1024, {0}), rng.uniform(0.1, 48, {0}))".format(size)])
+        report("su_cost_batch ({} jobs)".format(size), "su_cost_batch(*jobs)", setup, args.repeat)
+    for max_days, max_freq in GRID_SIZES:
+        cells = (max_days - 1) * (max_freq - 1)
+        report("cost_table ({} cells)".format(cells), "cost_table(140.0, {}, {})".format(max_days, max_freq), "from app import cost_table", args.repeat)
+        report("cost_surface ({} cells)".format(cells), "cost_surface(140.0, {}, {})".format(max_days, max_freq), "from app import cost_surface", args.repeat)
+
+if __name__ == '__main__':
+    main()
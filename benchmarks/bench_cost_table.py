@@ -0,0 +1,57 @@
+"""
+Benchmark the vectorized cost_table() against the original row-by-row DataFrame.append loop.
+Usage: python benchmarks/bench_cost_table.py [--repeat 3] [--legacy-max-cells 3100]
+"""
+import os
+import sys
+import time
+import argparse
+import itertools
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app import cost_table
+
+# (max_days, max_freq) pairs. Grid size is (max_days - 1) * (max_freq - 1) cells.
+GRID_SIZES = [(32, 101), (101, 101), (1001, 1001), (1001, 10001)]
+
+def legacy_cost_table(est_cost, max_days = 32, max_freq = 101):
+    """ the original implementation: one DataFrame copy per grid cell. """
+    df_surface = pd.DataFrame(columns=['Number of Days', 'Total Number of Jobs'])
+    for i in itertools.product(pd.Series(range(1, max_days)), pd.Series(range(1, max_freq))):
+        temp_row = pd.Series(list(i), index=['Number of Days', 'Total Number of Jobs'])
+        if hasattr(df_surface, "append"):
+            df_surface = df_surface.append(temp_row, ignore_index=True)
+        else: # pandas >= 2.0 removed DataFrame.append
+            df_surface = pd.concat([df_surface, temp_row.to_frame().T], ignore_index=True)
+    return(df_surface.assign(Cost = df_surface['Number of Days'] * df_surface['Total Number of Jobs'] * est_cost))
+
+def best_time(fx, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fx()
+        timings.append(time.perf_counter() - start)
+    return(min(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type = int, default = 3, help = "number of runs per grid size, the best run is reported")
+    parser.add_argument("--legacy-max-cells", type = int, default = 3100, help = "skip the legacy loop above this many cells")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.simplefilter("ignore", FutureWarning) # DataFrame.append deprecation
+    print("{:>12} {:>14} {:>14} {:>10}".format("cells", "vectorized (s)", "legacy (s)", "speedup"))
+    for max_days, max_freq in GRID_SIZES:
+        cells = (max_days - 1) * (max_freq - 1)
+        fast = best_time(lambda: cost_table(140.0, max_days = max_days, max_freq = max_freq), args.repeat)
+        if cells <= args.legacy_max_cells:
+            slow = best_time(lambda: legacy_cost_table(140.0, max_days = max_days, max_freq = max_freq), 1)
+            assert legacy_cost_table(140.0, max_days, max_freq).astype(float).equals(cost_table(140.0, max_days, max_freq).astype(float))
+            print("{:>12} {:>14.4f} {:>14.4f} {:>9.0f}x".format(cells, fast, slow, slow / fast))
+        else:
+            print("{:>12} {:>14.4f} {:>14} {:>10}".format(cells, fast, "skipped", "-"))
+
+if __name__ == '__main__':
+    main()
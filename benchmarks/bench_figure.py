@@ -0,0 +1,50 @@
+"""
+Compare the payload size and server-side build + JSON time of the original Mesh3d cost graph and the go.Surface graph.
+Browser render time is not measured here; the Mesh3d payload also has to be triangulated in the browser, the Surface payload does not.
+Usage: python benchmarks/bench_figure.py [--repeat 3] [--max-points 10000]
+"""
+import os
+import sys
+import time
+import argparse
+import plotly.io as pio
+import plotly.graph_objs as go
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app import cost_table, cost_surface
+
+# (max_days, max_freq) pairs. Grid size is (max_days - 1) * (max_freq - 1) cells.
+GRID_SIZES = [(32, 101), (101, 101), (366, 1001)]
+
+def mesh_json(est_cost, max_days, max_freq, max_points):
+    tbl = cost_table(est_cost, max_days = max_days, max_freq = max_freq)
+    fig = go.Figure(data=[go.Mesh3d(z=tbl['Cost'], x=tbl['Number of Days'], y=tbl['Total Number of Jobs'], opacity=1, intensity=tbl['Cost'], colorscale="Inferno")])
+    return(pio.to_json(fig))
+
+def surface_json(est_cost, max_days, max_freq, max_points):
+    days, freq, cost = cost_surface(est_cost, max_days = max_days, max_freq = max_freq, max_points = max_points)
+    return(pio.to_json(go.Figure(data=[go.Surface(x=days, y=freq, z=cost, colorscale="Inferno")])))
+
+def best_time(fx, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fx()
+        timings.append(time.perf_counter() - start)
+    return(min(timings), len(payload))
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type = int, default = 3, help = "number of runs per grid size, the best run is reported")
+    parser.add_argument("--max-points", type = int, default = 10000, help = "decimation limit of the surface graph")
+    args = parser.parse_args()
+
+    print("{:>10} {:<20} {:>10} {:>12}".format("cells", "graph", "time (s)", "payload (kB)"))
+    for max_days, max_freq in GRID_SIZES:
+        cells = (max_days - 1) * (max_freq - 1)
+        for name, fx, max_points in [("mesh3d", mesh_json, None), ("surface", surface_json, None), ("surface decimated", surface_json, args.max_points)]:
+            elapsed, size = best_time(lambda: fx(140.0, max_days, max_freq, max_points), args.repeat)
+            print("{:>10} {:<20} {:>10.4f} {:>12.1f}".format(cells, name, elapsed, size / 1024))
+
+if __name__ == '__main__':
+    main()
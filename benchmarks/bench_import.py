@@ -0,0 +1,33 @@
+"""
+Cold import time of the calculator modules, each measured in a fresh python process (what a gunicorn worker or a script pays on start).
+Usage: python benchmarks/bench_import.py [--repeat 5] [module ...]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MODULES = ["su_core", "su_stream", "app"]
+
+# time only the import, not the interpreter start up
+SNIPPET = "import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)"
+
+def import_time(module):
+    output = subprocess.run([sys.executable, "-c", SNIPPET.format(module)], cwd = ROOT, check = True, stdout = subprocess.PIPE, universal_newlines = True).stdout
+    return(float(output.strip().splitlines()[-1]))
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs = "*", default = MODULES, help = "modules to import (default: {})".format(" ".join(MODULES)))
+    parser.add_argument("--repeat", type = int, default = 5, help = "number of fresh processes per module, the median is reported")
+    args = parser.parse_args()
+
+    print("{:<12} {:>12} {:>12}".format("module", "median (ms)", "best (ms)"))
+    for module in args.modules:
+        timings = [import_time(module) for _ in range(args.repeat)]
+        print("{:<12} {:>12.1f} {:>12.1f}".format(module, statistics.median(timings) * 1000, min(timings) * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Scaling benchmark for su_stream.py's parallel mode: cost a synthetic sacct dump with 1 to N worker processes.
+Usage: python benchmarks/bench_parallel.py [--jobs 2000000] [--max-workers N] [--shard-size 16]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from su_stream import parallel_totals
+
+PARTITIONS = ['short', 'long', 'gpu', 'longgpu', 'fat', 'preempt']
+
+def write_sacct(path, jobs, seed = 0):
+    """ write a fake sacct --parsable2 dump with a job step after every job. """
+    rng = random.Random(seed)
+    with open(path, "w") as handle:
+        handle.write("JobID|Account|User|Partition|AllocNodes|AllocTRES|ElapsedRaw\n")
+        for job_id in range(jobs):
+            nodes = rng.randint(1, 4)
+            tres = "billing=1,cpu={},mem={}G,node={}".format(rng.randint(1, 28) * nodes, rng.randint(1, 128) * nodes, nodes)
+            if rng.random() < 0.1:
+                tres += ",gres/gpu={}".format(rng.randint(1, 4) * nodes)
+            row = [str(job_id), "lab{}".format(rng.randint(0, 99)), "user{}".format(rng.randint(0, 999)), rng.choice(PARTITIONS), str(nodes), tres, str(rng.randint(60, 86400))]
+            handle.write("|".join(row) + "\n")
+            row[0] = "{}.batch".format(job_id)
+            handle.write("|".join(row) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type = int, default = 2000000, help = "number of synthetic jobs")
+    parser.add_argument("--max-workers", type = int, default = os.cpu_count(), help = "largest worker count to try")
+    parser.add_argument("--shard-size", type = int, default = 16, help = "shard size in MB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sacct.txt")
+        write_sacct(path, args.jobs)
+        print("{} jobs, {:.0f} MB".format(args.jobs, os.path.getsize(path) / 1024 ** 2))
+        workers, counts = 1, []
+        while workers < args.max_workers:
+            counts.append(workers)
+            workers *= 2
+        counts.append(args.max_workers)
+        print("{:>8} {:>10} {:>10} {:>12}".format("workers", "time (s)", "speedup", "jobs/s"))
+        baseline, reference = None, None
+        for workers in counts:
+            start = time.perf_counter()
+            totals = parallel_totals([path], workers, shard_size = args.shard_size * 1024 ** 2)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            reference = reference or totals
+            assert totals == reference, "totals differ between worker counts"
+            print("{:>8} {:>10.2f} {:>9.2f}x {:>12.0f}".format(workers, elapsed, baseline / elapsed, args.jobs / elapsed))
+
+if __name__ == '__main__':
+    main()
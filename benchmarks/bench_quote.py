@@ -0,0 +1,54 @@
+"""
+Throughput of the JSON pricing API (/api/quote) in process: concurrent clients POST single-job quotes through the Flask server,
+once with request coalescing (SU_QUOTE_WAIT_MS) and once without waiting for other requests. Reports quotes/s, p50/p99 latency and
+the average number of requests per batch. Under gunicorn the same coalescing happens per worker when it runs with --threads.
+Usage: python benchmarks/bench_quote.py [--clients 1 8 32] [--requests 4000]
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+def percentile(values, q):
+    return(values[min(len(values) - 1, int(q * len(values)))] if values else float("nan"))
+
+def run(app, clients, requests):
+    jobs = [{"node_type": ("std", "gpu", "fat")[i % 3], "cpu": i % 28 + 1, "ram": 4 * (i % 32), "duration": 1 + i % 48} for i in range(requests)]
+    def worker(chunk):
+        client = app.server.test_client()
+        timings = []
+        for job in chunk:
+            start = time.perf_counter()
+            response = client.post("/api/quote", json = job)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.data[:200]
+        return(timings)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = clients) as pool:
+        timings = sorted(t for chunk_timings in pool.map(worker, [jobs[i::clients] for i in range(clients)]) for t in chunk_timings)
+    return(timings, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type = int, nargs = "+", default = [1, 8, 32], help = "concurrent clients")
+    parser.add_argument("--requests", type = int, default = 4000, help = "quotes per run")
+    parser.add_argument("--wait-ms", type = float, default = 2, help = "SU_QUOTE_WAIT_MS of the coalescing runs")
+    args = parser.parse_args()
+
+    import app
+    from su_quote import QuoteBatcher
+    print("{:<10} {:>8} {:>10} {:>10} {:>10} {:>14}".format("wait (ms)", "clients", "quotes/s", "p50 (ms)", "p99 (ms)", "reqs/batch"))
+    for wait in (0, args.wait_ms):
+        for clients in args.clients:
+            app.quote_batcher = QuoteBatcher(max_wait = wait / 1000)
+            run(app, clients, 100) # warm up
+            app.quote_batcher = batcher = QuoteBatcher(max_wait = wait / 1000)
+            timings, elapsed = run(app, clients, args.requests)
+            print("{:<10} {:>8} {:>10.0f} {:>10.2f} {:>10.2f} {:>14.1f}".format(
+                wait, clients, len(timings) / elapsed, percentile(timings, 0.5) * 1000, percentile(timings, 0.99) * 1000, batcher.requests / max(1, batcher.batches)))
+
+if __name__ == '__main__':
+    main()
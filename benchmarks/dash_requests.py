@@ -0,0 +1,64 @@
+"""
+Request bodies for the app's Dash callbacks, shared by bench_callbacks.py and load_test.py.
+Each body is what the browser POSTs to /_dash-update-component.
+"""
+import random
+
+CALLBACK_URL = "/_dash-update-component"
+
+def callback_request(outputs, inputs, changed):
+    """ outputs: [(component id, property)], inputs: [(component id, property, value)], changed: "id.property" of the input that fired. """
+    output_ids = [{"id": component, "property": prop} for component, prop in outputs]
+    if len(outputs) > 1:
+        output = ".." + "...".join("{}.{}".format(component, prop) for component, prop in outputs) + ".."
+    else:
+        output, output_ids = "{}.{}".format(*outputs[0]), output_ids[0]
+    return({
+        "output": output,
+        "outputs": output_ids,
+        "inputs": [{"id": component, "property": prop, "value": value} for component, prop, value in inputs],
+        "changedPropIds": [changed],
+    })
+
+def calc_cost_request(node_type = "std", node_count = 1, cpu = 1, gpu = 0, ram = 4, duration = 2.5, units = "units_su"):
+    return(callback_request(
+        [("output_su", "children"), ("output_su", "is_open"), ("intermediate_job_cost", "children")],
+        [("node_type", "value", node_type), ("node_count", "value", node_count), ("input_cpu", "value", cpu), ("input_gpu", "value", gpu),
+        ("input_ram", "value", ram), ("job_duration", "value", duration), ("input_units", "value", units)],
+        "node_type.value"))
+
+def table_graph_request(price = 140.0, units = "units_su", n_click = 1):
+    return(callback_request(
+        [("output_table", "columns"), ("output_graph", "figure")],
+        [("intermediate_cost", "children", price), ("input_units", "value", units), ("input_view", "n_clicks", n_click)],
+        "input_view.n_clicks"))
+
+def table_page_request(price = 140.0, units = "units_su", n_click = 1, page_current = 0, page_size = 100, sort_by = None, filter_query = ""):
+    return(callback_request(
+        [("output_table", "data"), ("output_table", "page_count")],
+        [("intermediate_cost", "children", price), ("input_units", "value", units), ("input_view", "n_clicks", n_click),
+        ("output_table", "page_current", page_current), ("output_table", "page_size", page_size),
+        ("output_table", "sort_by", sort_by or []), ("output_table", "filter_query", filter_query)],
+        "output_table.page_current"))
+
+def request_mix(count, seed = 0, node_types = ("std", "gpu", "fat")):
+    """
+    A reproducible list of (name, body) requests that looks like users filling in the sidebar: mostly calc_cost,
+    plus table_graph/table_page when the View button is open. A few popular inputs repeat, like real traffic.
+    """
+    rng = random.Random(seed)
+    mix = []
+    for _ in range(count):
+        if rng.random() < 0.5: # popular default-ish job
+            job = dict(node_type = "std", node_count = 1, cpu = 1, gpu = 0, ram = 4, duration = 2.5)
+        else:
+            job = dict(node_type = rng.choice(node_types), node_count = rng.randint(1, 4), cpu = rng.randint(1, 28), gpu = rng.randint(0, 4),
+                ram = rng.choice([4, 16, 64, 128, 256]), duration = rng.choice([0.5, 1, 2.5, 10, 24]))
+        kind = rng.random()
+        if kind < 0.7:
+            mix.append(("calc_cost", calc_cost_request(**job)))
+        elif kind < 0.85:
+            mix.append(("table_graph", table_graph_request(price = float(rng.randint(1, 5000)))))
+        else:
+            mix.append(("table_page", table_page_request(price = float(rng.randint(1, 5000)), page_current = rng.randint(0, 30))))
+    return(mix)
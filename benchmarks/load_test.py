@@ -0,0 +1,132 @@
+"""
+Load test of the app under gunicorn: concurrent clients replay a reproducible mix of Dash callback requests
+(see dash_requests.request_mix) and the p50/p99 latency and throughput are reported, overall and per callback.
+By default a local gunicorn is started with the given number of workers; --url targets a server that is already running.
+Usage: python benchmarks/load_test.py [--workers 2] [--clients 8] [--requests 2000] [--url http://127.0.0.1:8050]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+from dash_requests import CALLBACK_URL, request_mix
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return(sock.getsockname()[1])
+
+def start_gunicorn(workers, port, timeout = 60):
+    """ start gunicorn app:server in the repository and wait until it answers. """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app:server", "--workers", str(workers), "--bind", "127.0.0.1:{}".format(port), "--log-level", "warning"],
+        cwd = ROOT)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout = 5)
+            connection.request("GET", "/_dash-layout")
+            if connection.getresponse().status == 200:
+                return(process)
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start within {} s".format(timeout))
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return(float("nan"))
+    return(sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))])
+
+class Client:
+    """ one simulated browser with its own connection. """
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.connection = None
+
+    def post(self, body):
+        payload = json.dumps(body)
+        for attempt in range(2): # reconnect once if the server closed the connection
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout = 30)
+            try:
+                self.connection.request("POST", CALLBACK_URL, payload, {"Content-Type": "application/json"})
+                response = self.connection.getresponse()
+                response.read()
+                if response.getheader("Connection", "").lower() == "close":
+                    self.connection.close()
+                    self.connection = None
+                return(response.status)
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+def run(host, port, mix, clients):
+    """ replay mix with the given number of concurrent clients. Returns ([(name, seconds, ok)], wall time). """
+    chunks = [mix[i::clients] for i in range(clients)]
+    def worker(chunk):
+        client = Client(host, port)
+        results = []
+        for name, body in chunk:
+            start = time.perf_counter()
+            try:
+                ok = client.post(body) == 200
+            except (http.client.HTTPException, OSError):
+                ok = False
+            results.append((name, time.perf_counter() - start, ok))
+        return(results)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = clients) as pool:
+        results = [result for chunk_results in pool.map(worker, chunks) for result in chunk_results]
+    return(results, time.perf_counter() - start)
+
+def summarize(results, elapsed):
+    print("{:<14} {:>9} {:>8} {:>10} {:>10} {:>12}".format("callback", "requests", "errors", "p50 (ms)", "p99 (ms)", "req/s"))
+    names = sorted(set(name for name, _, _ in results))
+    for name in names + ["all"]:
+        selected = [(seconds, ok) for result_name, seconds, ok in results if name in ("all", result_name)]
+        latencies = sorted(seconds for seconds, ok in selected if ok)
+        errors = sum(1 for _, ok in selected if not ok)
+        print("{:<14} {:>9} {:>8} {:>10.2f} {:>10.2f} {:>12.1f}".format(
+            name, len(selected), errors, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, len(selected) / elapsed))
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default = None, help = "base url of a running server (default: start gunicorn)")
+    parser.add_argument("--workers", type = int, default = 2, help = "gunicorn workers to start")
+    parser.add_argument("--clients", type = int, default = 8, help = "concurrent clients")
+    parser.add_argument("--requests", type = int, default = 2000, help = "total number of requests")
+    parser.add_argument("--warmup", type = int, default = 50, help = "requests sent before measuring")
+    parser.add_argument("--seed", type = int, default = 0, help = "seed of the request mix")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        parsed = urllib.parse.urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        process = start_gunicorn(args.workers, port)
+    try:
+        run(host, port, request_mix(args.warmup, seed = args.seed + 1), args.clients)
+        results, elapsed = run(host, port, request_mix(args.requests, seed = args.seed), args.clients)
+        print("{} requests, {} clients{}, {:.2f} s".format(args.requests, args.clients, "" if args.url else ", {} gunicorn workers".format(args.workers), elapsed))
+        summarize(results, elapsed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+if __name__ == '__main__':
+    main()
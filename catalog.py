@@ -0,0 +1,74 @@
+"""
+Hardware/rate catalog of the Talapas node types.
+
+The catalog is a JSON or YAML file (node_types.json next to this file by default, or the file named by SU_NODE_TYPES):
+    su_dollar           dollars per service unit
+    su_per_node_hour    normalization, SUs of one base node for one hour
+    node_types          list of {id, label, factor, cpu, gpu, ram, gpu_billing, partitions}. cpu/gpu/ram are the totals of one node
+                        (ram in GB, normalized to 1024 GB on fat nodes) and partitions are the SLURM partitions served by that node type.
+                        gpu is the number of GPUs installed. gpu_billing is the GPU total of the SU formula and defaults to gpu,
+                        so GPUs requested on a node type without any are still billed against it.
+    default_node_type   optional id that SLURM partitions not listed under any node type are billed as. Without it su_stream.py rejects them.
+Adding a node type to the file makes it available to the dropdown, su_cost(), su_cost_batch() and su_stream.py.
+
+load_catalog() compiles the file into a Catalog with precomputed reciprocals of the node totals, so costing a job is a lookup plus multiplications.
+"""
+import os
+import json
+import hashlib
+from collections import namedtuple
+
+default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "node_types.json")
+
+# rates: {id: (factor, 1 / cpu, 1 / gpu, 1 / ram)}. A total of 0 (e.g. no gpus) gets a reciprocal of 0 so that resource never drives the SUs.
+# version: hash of the catalog contents, changes whenever a rate or node total changes (see su_ledger.py).
+# totals: {id: (cpu, gpu, ram)} as written in the file (gpu installed, not gpu_billing), for turning a node share back into resources.
+# ids, factor, inv_cpu, inv_gpu and inv_ram hold the same rates as parallel tuples in catalog order, for array lookups by index.
+# default_node_type: id for partitions missing from partitions, or None.
+Catalog = namedtuple("Catalog", [
+    "version", "su_dollar", "su_per_node_hour", "labels", "rates", "totals", "index",
+    "ids", "factor", "inv_cpu", "inv_gpu", "inv_ram", "partitions", "default_node_type"])
+
+def reciprocal(total):
+    return(1 / total if total else 0.0)
+
+def read_catalog(path):
+    with open(path) as handle:
+        if path.endswith((".yml", ".yaml")):
+            import yaml # only needed for YAML catalogs
+            return(yaml.safe_load(handle))
+        return(json.load(handle))
+
+def compile_catalog(spec):
+    """ check a catalog dict and turn it into a Catalog. """
+    labels, rates, totals, index, partitions = {}, {}, {}, {}, {}
+    for node in spec.get("node_types", []):
+        missing = [field for field in ("id", "factor", "cpu", "gpu", "ram") if field not in node]
+        if missing:
+            raise ValueError("node type {} is missing {}".format(node, missing))
+        if node["id"] in rates:
+            raise ValueError("node type '{}' is defined twice".format(node["id"]))
+        gpu_billing = node.get("gpu_billing", node["gpu"])
+        if node["cpu"] <= 0 or node["ram"] <= 0 or node["gpu"] < 0 or gpu_billing < 0:
+            raise ValueError("node type '{}' needs positive cpu and ram totals".format(node["id"]))
+        index[node["id"]] = len(index)
+        labels[node["id"]] = node.get("label", node["id"])
+        rates[node["id"]] = (node["factor"], reciprocal(node["cpu"]), reciprocal(gpu_billing), reciprocal(node["ram"]))
+        totals[node["id"]] = (node["cpu"], node["gpu"], node["ram"])
+        for partition in node.get("partitions", []):
+            partitions[partition] = node["id"]
+    if not rates:
+        raise ValueError("the catalog has no node types")
+    default_node_type = spec.get("default_node_type")
+    if default_node_type is not None and default_node_type not in rates:
+        raise ValueError("default_node_type '{}' is not one of the node types {}".format(default_node_type, list(rates)))
+    ids = tuple(rates)
+    factor, inv_cpu, inv_gpu, inv_ram = zip(*(rates[node_id] for node_id in ids))
+    version = hashlib.sha1(json.dumps(spec, sort_keys = True).encode()).hexdigest()[:12]
+    return(Catalog(version, spec.get("su_dollar", 0.025), spec.get("su_per_node_hour", 28), labels, rates, totals, index,
+        ids, factor, inv_cpu, inv_gpu, inv_ram, partitions, default_node_type))
+
+def load_catalog(path = None):
+    """ read and compile the catalog at path, SU_NODE_TYPES or node_types.json. """
+    path = path or os.environ.get("SU_NODE_TYPES") or default_path
+    return(compile_catalog(read_catalog(path)))
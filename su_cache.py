@@ -0,0 +1,186 @@
+"""
+Small LRU caches for the Dash callbacks.
+
+The backend is picked with environment variables so gunicorn workers can share results:
+    SU_CACHE=memory (default)   one LRU cache per worker process
+    SU_CACHE=filesystem         pickled entries in SU_CACHE_DIR (default: <tmp>/su_cache-<uid>), shared by every worker of the same user on the machine.
+                                The directory must be owned by that user and not writable by anyone else, since the workers unpickle its files.
+    SU_CACHE=off                no caching
+    SU_CACHE_SIZE               maximum number of entries (default: 256)
+"""
+import os
+import pickle
+import hashlib
+import tempfile
+import functools
+import threading
+from collections import OrderedDict
+
+MISSING = object()
+
+class MemoryCache:
+    """ least recently used cache held in the current process. """
+    def __init__(self, maxsize = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return(self._data[key])
+            self.misses += 1
+            return(MISSING)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last = False)
+
+    def __len__(self):
+        return(len(self._data))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return({"backend": "memory", "hits": self.hits, "misses": self.misses, "size": len(self), "maxsize": self.maxsize})
+
+def private_directory(directory):
+    """ create directory with mode 0o700, or check that an existing one belongs to the current user and only they can write to it. """
+    os.makedirs(directory, mode = 0o700, exist_ok = True)
+    if not hasattr(os, "getuid"): # no POSIX owners/modes to check
+        return(directory)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid():
+        raise PermissionError("cache directory {} is owned by uid {}, not by the current user ({})".format(directory, info.st_uid, os.getuid()))
+    if info.st_mode & 0o022:
+        raise PermissionError("cache directory {} is writable by other users (mode {:o}). Run chmod 700 on it.".format(directory, info.st_mode & 0o777))
+    return(directory)
+
+class FileCache:
+    """
+    Least recently used cache stored as one pickle per entry in a directory. Files are written atomically so several processes can share it.
+    Hit/miss counters are per process. The directory (and its parent) must be private to the current user, see private_directory().
+    """
+    def __init__(self, directory, maxsize = 256):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        private_directory(os.path.dirname(os.path.abspath(directory)))
+        private_directory(directory)
+
+    def _path(self, key):
+        return(os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl"))
+
+    def _entries(self):
+        return([entry for entry in os.scandir(self.directory) if entry.name.endswith(".pkl")])
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                stored_key, value = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return(MISSING)
+        if stored_key != key: # sha1 collision
+            self.misses += 1
+            return(MISSING)
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return(value)
+
+    def set(self, key, value):
+        handle, temp_path = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+        with os.fdopen(handle, "wb") as temp:
+            pickle.dump((key, value), temp, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self._path(key))
+        entries = self._entries()
+        if len(entries) > self.maxsize:
+            entries.sort(key = lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.maxsize]:
+                try:
+                    os.remove(entry.path)
+                except OSError: # already evicted by another worker
+                    pass
+
+    def __len__(self):
+        return(len(self._entries()))
+
+    def clear(self):
+        for entry in self._entries():
+            os.remove(entry.path)
+
+    def stats(self):
+        return({"backend": "filesystem", "hits": self.hits, "misses": self.misses, "size": len(self), "maxsize": self.maxsize})
+
+class NullCache:
+    """ stand-in that never stores anything. """
+    maxsize = 0
+    hits = 0
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return(MISSING)
+
+    def set(self, key, value):
+        pass
+
+    def __len__(self):
+        return(0)
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return({"backend": "off", "hits": 0, "misses": self.misses, "size": 0, "maxsize": 0})
+
+def make_cache(name = None, maxsize = None):
+    """
+    build a cache from the SU_CACHE* environment variables. name separates the entries of different callbacks in the filesystem backend.
+    maxsize overrides SU_CACHE_SIZE for caches of large entries.
+    """
+    backend = os.environ.get("SU_CACHE", "memory")
+    if maxsize is None:
+        maxsize = int(os.environ.get("SU_CACHE_SIZE", 256))
+    if backend == "memory":
+        return(MemoryCache(maxsize))
+    if backend == "filesystem":
+        default = "su_cache-{}".format(os.getuid()) if hasattr(os, "getuid") else "su_cache"
+        directory = os.environ.get("SU_CACHE_DIR", os.path.join(tempfile.gettempdir(), default))
+        return(FileCache(os.path.join(directory, name or "default"), maxsize))
+    if backend == "off":
+        return(NullCache())
+    raise ValueError("unknown SU_CACHE backend '{}'. Must be 'memory', 'filesystem' or 'off'.".format(backend))
+
+def memoize(cache, key):
+    """ cache the results of a function. key(*args) normalizes the arguments into a hashable cache key, or returns None to skip the cache. """
+    def decorator(fx):
+        @functools.wraps(fx)
+        def wrapper(*args):
+            cache_key = key(*args)
+            if cache_key is None:
+                return(fx(*args))
+            value = cache.get(cache_key)
+            if value is MISSING:
+                value = fx(*args)
+                cache.set(cache_key, value)
+            return(value)
+        wrapper.cache = cache
+        return(wrapper)
+    return(decorator)
@@ -0,0 +1,110 @@
+"""
+Service unit (SU) formula of the Talapas calculator without any Dash or pandas dependency.
+Scripts that only need su_cost() can import this module; numpy is loaded the first time su_cost_batch() is called.
+The README examples are checked in test_su_core.py.
+"""
+from catalog import load_catalog
+
+# node types and rates from node_types.json (or the file named by SU_NODE_TYPES). See catalog.py.
+catalog = load_catalog()
+su_dollar = catalog.su_dollar # number of dollars per service unit
+
+# Service Units Equation = SUM over allocated nodes(max(AllocCPU/TotCPU, AllocRAM/TotRAM, AllocGRES/TotGRES) * NTF) * 28 Service Units/hour * job duration in hours
+
+# define top resource used
+def top_resource(alloc_CPU, cpu_denominator, alloc_GPU, gpu_denominator, alloc_RAM, ram_denominator):
+    return( max([alloc_CPU / cpu_denominator, alloc_GPU / gpu_denominator, alloc_RAM / ram_denominator]) )
+
+def node_rates(node_type):
+    """ (node factor, 1 / total cpu, 1 / total gpu, 1 / total ram) of a node type in the catalog. """
+    try:
+        return(catalog.rates[node_type])
+    except KeyError:
+        raise ValueError("unknown node type '{}'. Must be one of {}.".format(node_type, list(catalog.ids)))
+
+def su_cost(node_type, node_count, cpu, gpu, ram, duration):
+    """
+    Calculates SU of one job. calc_cost() uses it for the displayed price, and its plain output format is friendly for unit tests. This fx omits button clicks and dollar units.
+    """
+    # node totals come from the catalog as reciprocals, so the ratios are multiplications
+    node_factor, inv_cpu, inv_gpu, inv_ram = node_rates(node_type)
+    max_resource = max(cpu * inv_cpu, gpu * inv_gpu, ram * inv_ram)
+    su = ( (node_count * (max_resource * node_factor)) * catalog.su_per_node_hour * duration )
+    return(su)
+
+def su_budget(budget, units = "units_su", node_type = None, min_cpu = 1, min_gpu = 0, min_ram = 0, min_nodes = 1, max_nodes = 1, min_hours = None, node_counts = None):
+    """
+    Largest jobs that fit in a budget of SUs (or dollars with units = "units_dollars"), the inverse of su_cost().
+    SUs only depend on the largest share of a node a job uses, so the cheapest share covering the minimum resources is
+    share = max(min_cpu / total cpu, min_gpu / total gpu, min_ram / total ram), and the other resources can grow up to that share for free.
+    GPUs are only handed out on node types that have them installed (catalog.totals), even where the SU formula bills GPUs.
+    For every node type (or only node_type) and node count in [min_nodes, max_nodes] (or in node_counts) the budget then lasts
+    hours = budget / (node_count * share * node factor * su_per_node_hour), or hours_full_node when whole nodes are reserved.
+    With min_hours, node counts that cannot run that long are left out.
+    Returns a list of dicts ordered by node type and node count. Node types that cannot meet the minimums are left out.
+    """
+    if min_cpu <= 0 and min_gpu <= 0 and min_ram <= 0:
+        raise ValueError("at least one of min_cpu, min_gpu or min_ram must be above 0")
+    budget_su = budget / catalog.su_dollar if units == "units_dollars" else budget
+    plans = []
+    for node_id in (catalog.ids if node_type is None else [node_type]):
+        node_factor, inv_cpu, inv_gpu, inv_ram = node_rates(node_id)
+        tot_cpu, tot_gpu, tot_ram = catalog.totals[node_id]
+        share = max(min_cpu * inv_cpu, min_gpu * inv_gpu, min_ram * inv_ram)
+        if share > 1 or min_gpu > tot_gpu: # does not fit on one node, or the node type has too few GPUs
+            continue
+        node_hour = share * node_factor * catalog.su_per_node_hour # SUs of one node for one hour at this share
+        last_node = max_nodes if node_counts is None else max(node_counts, default = 0)
+        if min_hours:
+            last_node = min(last_node, int(budget_su // (node_hour * min_hours)))
+        for node_count in (range(min_nodes, last_node + 1) if node_counts is None else [count for count in node_counts if count <= last_node]):
+            plans.append({
+                "node_type": node_id,
+                "node_count": node_count,
+                "cpu": max(min_cpu, int(share * tot_cpu + 1e-9)),
+                "gpu": max(min_gpu, int(share * tot_gpu + 1e-9)),
+                "ram": max(min_ram, share * tot_ram),
+                "node_share": share,
+                "hours": budget_su / (node_count * node_hour),
+                "hours_full_node": budget_su / (node_count * node_factor * catalog.su_per_node_hour),
+            })
+    return(plans)
+
+def su_cost_batch(node_type, node_count, cpu, gpu, ram, duration):
+    """
+    Vectorized su_cost() over whole job manifests (e.g. sacct exports). Every argument is an array-like of equal length, one entry per job.
+    Returns a numpy array of service units that is identical to calling su_cost() on each job.
+    """
+    import numpy as np # loaded on first use so importing su_core stays cheap
+    # look up every job's rates by its position in the catalog instead of branching on node type
+    names, codes = np.unique(np.asarray(node_type), return_inverse = True)
+    unknown = [name for name in names if name not in catalog.index]
+    if unknown:
+        raise ValueError("unknown node type(s) {}. Must be one of {}.".format(unknown, list(catalog.ids)))
+    codes = np.array([catalog.index[name] for name in names], dtype = np.intp)[codes]
+    # same operation order as su_cost() so results match bit for bit
+    max_resource = np.maximum(np.maximum(
+        np.asarray(cpu, dtype = float) * np.asarray(catalog.inv_cpu)[codes],
+        np.asarray(gpu, dtype = float) * np.asarray(catalog.inv_gpu)[codes]),
+        np.asarray(ram, dtype = float) * np.asarray(catalog.inv_ram)[codes])
+    su = ( (np.asarray(node_count, dtype = float) * (max_resource * np.asarray(catalog.factor, dtype = float)[codes])) * catalog.su_per_node_hour * np.asarray(duration, dtype = float) )
+    return(su)
+
+def su_workflow(jobs):
+    """
+    SUs of a workflow, i.e. a list of job dicts with node_type, node_count, cpu, gpu, ram and duration, plus optional stage (name) and count (number of identical jobs, default 1).
+    All jobs are costed in one su_cost_batch() pass. Returns (SUs per job row including its count, per-stage list of {stage, jobs, su, share} in order of first appearance, total SUs).
+    """
+    import numpy as np
+    if not jobs:
+        return(np.zeros(0), [], 0.0)
+    columns = {name: [job[name] for job in jobs] for name in ('node_type', 'node_count', 'cpu', 'gpu', 'ram', 'duration')}
+    count = np.array([job.get("count", 1) for job in jobs], dtype = float)
+    su = su_cost_batch(**columns) * count
+    total = float(su.sum())
+    stage_names = [str(job.get("stage") or "") for job in jobs]
+    names, first, codes = np.unique(stage_names, return_index = True, return_inverse = True)
+    stage_su = np.bincount(codes, weights = su, minlength = len(names))
+    stage_jobs = np.bincount(codes, weights = count, minlength = len(names))
+    stages = [{"stage": str(names[i]), "jobs": float(stage_jobs[i]), "su": float(stage_su[i]), "share": float(stage_su[i]) / total if total else 0.0} for i in np.argsort(first)]
+    return(su, stages, total)
@@ -0,0 +1,275 @@
+"""
+Incremental usage ledger: costed jobs are stored once, by month, in a columnar on-disk format so reports never re-cost old jobs.
+
+Examples:
+    sacct -a -X -S 2020-05-01 -E 2020-06-01 --parsable2 -o JobID,Account,User,Partition,AllocNodes,AllocTRES,ElapsedRaw,End > may.txt
+    python su_ledger.py ledger/ ingest may.txt
+    python su_ledger.py ledger/ report --by account --months 2020-05 2020-06
+    python su_ledger.py ledger/ recost
+
+Layout of the ledger directory:
+    dictionary.json                         names of the accounts, users, partitions and node types. Columns store their position in these lists.
+    months/<YYYY-MM>/rollup.json            jobs and SUs of the month per account, user and partition
+    months/<YYYY-MM>/seg-<n>/<column>.npy   one numpy array per column for every ingested batch, read with memory mapping
+    months/<YYYY-MM>/seg-<n>/meta.json      number of jobs and the catalog version they were costed with
+
+Jobs are filed under the month they ended in (sacct End column, or a month/end column in CSV input). Running jobs are skipped until they end.
+Job IDs already in the ledger are ignored, so overlapping sacct dumps can be ingested safely. CSV input therefore needs a job_id column,
+records without a job id are reported as malformed.
+recost only re-costs segments whose catalog version differs from the current node_types.json.
+The ledger assumes one writer at a time.
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+import tempfile
+import numpy as np
+from su_core import su_cost_batch, su_dollar, catalog
+from su_stream import read_records, chunked, parse_partition_map, SkippedRecords
+
+CATEGORIES = ['account', 'user', 'partition', 'node_type']
+NUMBERS = ['node_count', 'cpu', 'gpu', 'ram', 'duration', 'su']
+COLUMNS = ['job_id'] + CATEGORIES + NUMBERS
+
+def job_month(row):
+    """ YYYY-MM the job ended in, or None while it is still running. """
+    end = row.get('End') or row.get('end') or row.get('month') or ""
+    if len(end) < 7 or not end[:4].isdigit():
+        return(None)
+    return(end[:7])
+
+def write_json(path, data):
+    """ write json atomically so readers never see half a file. """
+    handle, temp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = ".tmp")
+    with os.fdopen(handle, "w") as temp:
+        json.dump(data, temp)
+    os.replace(temp_path, path)
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return(default)
+    with open(path) as handle:
+        return(json.load(handle))
+
+class Ledger:
+    def __init__(self, directory):
+        self.directory = directory
+        self.months_dir = os.path.join(directory, "months")
+        os.makedirs(self.months_dir, exist_ok = True)
+        self.dictionary = read_json(os.path.join(directory, "dictionary.json"), {category: [] for category in CATEGORIES})
+        self._codes = {category: {name: code for code, name in enumerate(names)} for category, names in self.dictionary.items()}
+        self._known_ids = {}
+
+    # layout --------------------------------------------------------------------
+
+    def months(self):
+        return(sorted(name for name in os.listdir(self.months_dir) if not name.startswith(".")))
+
+    def segments(self, month):
+        month_dir = os.path.join(self.months_dir, month)
+        if not os.path.isdir(month_dir):
+            return([])
+        return([os.path.join(month_dir, name) for name in sorted(os.listdir(month_dir)) if name.startswith("seg-")])
+
+    def encode(self, category, names):
+        """ dictionary codes of names, adding names that are not in the dictionary yet. """
+        codes = self._codes[category]
+        for name in set(names) - set(codes):
+            codes[name] = len(self.dictionary[category])
+            self.dictionary[category].append(name)
+        return(np.array([codes[name] for name in names], dtype = np.int32))
+
+    # reading -------------------------------------------------------------------
+
+    def read(self, months = None, columns = ('su',), decode = True):
+        """
+        Columns of all jobs in the given months (default: all months) as {column: numpy array}. Only the requested column files are opened.
+        Category columns (account, user, partition, node_type) are returned as names, or as dictionary codes with decode = False.
+        """
+        segments = [segment for month in (months or self.months()) for segment in self.segments(month)]
+        data = {}
+        for column in columns:
+            parts = [np.load(os.path.join(segment, column + ".npy"), mmap_mode = "r") for segment in segments]
+            values = np.concatenate(parts) if parts else np.array([])
+            if decode and column in CATEGORIES:
+                values = np.array(self.dictionary[column], dtype = object)[values.astype(np.intp)]
+            data[column] = values
+        return(data)
+
+    def rollup(self, months = None, by = "account"):
+        """ {name: [jobs, su]} from the precomputed monthly rollups, without touching the job columns. """
+        totals = {}
+        for month in (months or self.months()):
+            month_rollup = read_json(os.path.join(self.months_dir, month, "rollup.json"), {})
+            for name, (jobs, su) in month_rollup.get(by, {}).items():
+                total = totals.setdefault(name, [0, 0.0])
+                total[0] += jobs
+                total[1] += su
+        return(totals)
+
+    # writing -------------------------------------------------------------------
+
+    def known_ids(self, month):
+        """ job ids already filed under month, loaded once per Ledger. """
+        if month not in self._known_ids:
+            ids = set()
+            for segment in self.segments(month):
+                ids.update(np.load(os.path.join(segment, "job_id.npy")).tolist())
+            self._known_ids[month] = ids
+        return(self._known_ids[month])
+
+    def write_segment(self, month, data):
+        month_dir = os.path.join(self.months_dir, month)
+        os.makedirs(month_dir, exist_ok = True)
+        segments = self.segments(month)
+        number = int(os.path.basename(segments[-1])[4:]) + 1 if segments else 1
+        # write into a temporary directory and rename it so a segment appears complete or not at all
+        temp_dir = tempfile.mkdtemp(dir = month_dir, prefix = ".seg-")
+        for column in COLUMNS:
+            np.save(os.path.join(temp_dir, column + ".npy"), data[column])
+        write_json(os.path.join(temp_dir, "meta.json"), {"rows": len(data['job_id']), "rate_version": catalog.version})
+        os.rename(temp_dir, os.path.join(month_dir, "seg-{:06d}".format(number)))
+
+    def update_rollup(self, month, data):
+        """ add jobs to the month's rollups. """
+        path = os.path.join(self.months_dir, month, "rollup.json")
+        month_rollup = read_json(path, {})
+        for by in ('account', 'user', 'partition'):
+            names = self.dictionary[by]
+            group_rollup = month_rollup.setdefault(by, {})
+            codes, inverse = np.unique(data[by], return_inverse = True)
+            jobs = np.bincount(inverse, minlength = len(codes))
+            su = np.bincount(inverse, weights = data['su'], minlength = len(codes))
+            for code, group_jobs, group_su in zip(codes.tolist(), jobs.tolist(), su.tolist()):
+                total = group_rollup.setdefault(names[code], [0, 0.0])
+                total[0] += group_jobs
+                total[1] += group_su
+        write_json(path, month_rollup)
+
+    def add_jobs(self, month, records):
+        """ cost and file (job, partition) records of one month, skipping job ids that are already in the ledger. Returns the number of new jobs. """
+        known = self.known_ids(month)
+        fresh = {}
+        for job, partition in records:
+            if job[0] not in known and job[0] not in fresh:
+                fresh[job[0]] = (job, partition)
+        if not fresh:
+            return(0)
+        jobs, partitions = zip(*fresh.values())
+        job_id, account, user, node_type, node_count, cpu, gpu, ram, duration = zip(*jobs)
+        data = {
+            'job_id': np.array(job_id, dtype = str),
+            'account': self.encode('account', account),
+            'user': self.encode('user', user),
+            'partition': self.encode('partition', partitions),
+            'node_type': self.encode('node_type', node_type),
+            'node_count': np.array(node_count, dtype = float),
+            'cpu': np.array(cpu, dtype = float),
+            'gpu': np.array(gpu, dtype = float),
+            'ram': np.array(ram, dtype = float),
+            'duration': np.array(duration, dtype = float),
+            'su': su_cost_batch(node_type, node_count, cpu, gpu, ram, duration),
+        }
+        # the dictionary goes first so every code in a segment can be decoded
+        write_json(os.path.join(self.directory, "dictionary.json"), self.dictionary)
+        self.write_segment(month, data)
+        self.update_rollup(month, data)
+        known.update(fresh)
+        return(len(fresh))
+
+    def ingest(self, handle, fmt = "auto", partition_map = None, chunk_size = 100000, on_error = None):
+        """ file every finished job of an open sacct/CSV file, one chunk at a time. Returns the number of new jobs. See su_stream.read_records() for on_error. """
+        added = 0
+        records = ((job_month(row), job, row.get('Partition') or row.get('partition') or job[3]) for row, job in read_records(handle, fmt, partition_map, on_error = on_error, require_id = True))
+        for chunk in chunked((record for record in records if record[0] is not None), chunk_size):
+            by_month = {}
+            for month, job, partition in chunk:
+                by_month.setdefault(month, []).append((job, partition))
+            for month in sorted(by_month):
+                added += self.add_jobs(month, by_month[month])
+        return(added)
+
+    def rebuild_rollup(self, month):
+        """ recompute the month's rollups from its segments. """
+        path = os.path.join(self.months_dir, month, "rollup.json")
+        if os.path.exists(path):
+            os.remove(path)
+        for segment in self.segments(month):
+            self.update_rollup(month, {column: np.load(os.path.join(segment, column + ".npy")) for column in ('account', 'user', 'partition', 'su')})
+
+    def recost(self):
+        """ re-cost the segments costed with another catalog version than the current one. Returns the number of re-costed jobs. """
+        recosted = 0
+        for month in self.months():
+            month_recosted = 0
+            for segment in self.segments(month):
+                meta = read_json(os.path.join(segment, "meta.json"), {})
+                if meta.get("rate_version") == catalog.version:
+                    continue
+                data = {column: np.load(os.path.join(segment, column + ".npy")) for column in ('node_type', 'node_count', 'cpu', 'gpu', 'ram', 'duration')}
+                node_type = np.array(self.dictionary['node_type'], dtype = object)[data['node_type'].astype(np.intp)]
+                su = su_cost_batch(node_type, data['node_count'], data['cpu'], data['gpu'], data['ram'], data['duration'])
+                np.save(os.path.join(segment, "su.npy"), su)
+                write_json(os.path.join(segment, "meta.json"), {"rows": len(su), "rate_version": catalog.version})
+                month_recosted += len(su)
+            if month_recosted:
+                self.rebuild_rollup(month)
+                recosted += month_recosted
+        return(recosted)
+
+# command line --------------------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ledger", help = "ledger directory (created if missing)")
+    commands = parser.add_subparsers(dest = "command")
+    ingest = commands.add_parser("ingest", help = "add the finished jobs of sacct/CSV files")
+    ingest.add_argument("input", nargs = "+", help = "sacct --parsable2 dump(s) or CSV file(s) with job_id and End/end/month columns, '-' for stdin")
+    ingest.add_argument("--format", choices = ["auto", "sacct", "csv"], default = "auto", help = "input format (default: guessed from the header line)")
+    ingest.add_argument("--chunk-size", type = int, default = 100000, help = "number of jobs costed per batch (default: 100000)")
+    ingest.add_argument("--partition", action = "append", default = [], metavar = "NAME=TYPE", help = "map a sacct partition to a node type of the catalog. Repeatable.")
+    ingest.add_argument("--strict", action = "store_true", help = "stop at the first malformed record instead of skipping it")
+    report = commands.add_parser("report", help = "SUs and dollars per account, user or partition")
+    report.add_argument("--by", choices = ["account", "user", "partition"], default = "account", help = "grouping (default: account)")
+    report.add_argument("--months", nargs = "*", default = None, help = "YYYY-MM months to include (default: all)")
+    commands.add_parser("recost", help = "re-cost jobs costed with an older node_types.json")
+    return(parser)
+
+def main(argv = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.error("choose a command: ingest, report or recost")
+    ledger = Ledger(args.ledger)
+    if args.command == "ingest":
+        try:
+            partition_map = parse_partition_map(args.partition)
+        except ValueError as error:
+            parser.error(str(error))
+        skipped = None if args.strict else SkippedRecords()
+        for path in args.input:
+            handle = sys.stdin if path == "-" else open(path, newline = "")
+            if skipped is not None:
+                skipped.source = path
+            try:
+                added = ledger.ingest(handle, args.format, partition_map, args.chunk_size, skipped)
+            except ValueError as error:
+                parser.error("{}: {}".format(path, error))
+            finally:
+                if handle is not sys.stdin:
+                    handle.close()
+            print("{}: {} new jobs".format(path, added), file = sys.stderr)
+        if skipped is not None:
+            skipped.summary()
+    elif args.command == "report":
+        writer = csv.writer(sys.stdout)
+        writer.writerow([args.by, 'jobs', 'su', 'dollars'])
+        for name, (jobs, su) in sorted(ledger.rollup(args.months, args.by).items()):
+            writer.writerow([name, jobs, round(su, 4), round(su * su_dollar, 2)])
+    elif args.command == "recost":
+        print("{} jobs re-costed".format(ledger.recost()), file = sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Opt-in timing of the Dash callbacks and their stages.
+
+    SU_METRICS=1        record call counts, timings and payload sizes. app.py serves them as JSON at /metrics (per worker process).
+    SU_PROFILE=<dir>    run every callback under cProfile and dump one <callback>-<pid>-<n>.prof file per call into <dir>
+                        (read them with `python -m pstats` or snakeviz).
+
+Both are off by default, and then timed() and instrument() add next to no overhead.
+"""
+import os
+import time
+import cProfile
+import functools
+import threading
+import contextlib
+
+enabled = os.environ.get("SU_METRICS", "") not in ("", "0")
+profile_dir = os.environ.get("SU_PROFILE") or None
+
+_stats = {}
+_lock = threading.Lock()
+_profile_count = 0
+_no_timer = contextlib.suppress() # reusable context manager that does nothing
+
+def record(name, seconds = None, size = None):
+    """ add one observation of name: its duration in seconds and/or its payload size in bytes. """
+    if not enabled:
+        return
+    with _lock:
+        stat = _stats.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0, "bytes": 0, "max_bytes": 0})
+        stat["calls"] += 1
+        if seconds is not None:
+            ms = seconds * 1000
+            stat["total_ms"] += ms
+            stat["last_ms"] = ms
+            stat["max_ms"] = max(stat["max_ms"], ms)
+        if size is not None:
+            stat["bytes"] += size
+            stat["max_bytes"] = max(stat["max_bytes"], size)
+
+@contextlib.contextmanager
+def _timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+def timed(name):
+    """ context manager that records how long its block takes under name. """
+    if not enabled:
+        return(_no_timer)
+    return(_timer(name))
+
+def _profiled(name, fx, args, kwargs):
+    global _profile_count
+    with _lock:
+        _profile_count += 1
+        count = _profile_count
+    profiler = cProfile.Profile()
+    try:
+        return(profiler.runcall(fx, *args, **kwargs))
+    finally:
+        os.makedirs(profile_dir, exist_ok = True)
+        profiler.dump_stats(os.path.join(profile_dir, "{}-{}-{}.prof".format(name, os.getpid(), count)))
+
+def instrument(name):
+    """ decorator that times every call of a callback under name, and profiles it when SU_PROFILE is set. """
+    def decorator(fx):
+        if not enabled and profile_dir is None:
+            return(fx)
+        @functools.wraps(fx)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                if profile_dir is not None:
+                    return(_profiled(name, fx, args, kwargs))
+                return(fx(*args, **kwargs))
+        return(wrapper)
+    return(decorator)
+
+def snapshot():
+    """ copy of the recorded stats with the mean duration of each entry added. """
+    with _lock:
+        stats = {name: dict(stat) for name, stat in _stats.items()}
+    for stat in stats.values():
+        stat["mean_ms"] = stat["total_ms"] / stat["calls"] if stat["calls"] else 0.0
+    return({"enabled": enabled, "profile_dir": profile_dir, "pid": os.getpid(), "stats": stats})
+
+def reset():
+    with _lock:
+        _stats.clear()
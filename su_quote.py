@@ -0,0 +1,114 @@
+"""
+Batched SU quotes for the JSON pricing API (/api/quote in app.py).
+
+Request threads hand their jobs to one QuoteBatcher per worker process. A background thread collects the jobs of every request that
+arrives within a few milliseconds of the first one and costs them all in one su_cost_batch() call, so concurrent quotes share the
+numpy overhead instead of paying it per request. The Procfile runs gunicorn with threads (`--threads 8`) so one worker
+serves several requests at once.
+
+    SU_QUOTE_BATCH      maximum number of jobs costed together (default: 4096)
+    SU_QUOTE_WAIT_MS    how long the first request of a batch waits for others to join (default: 2)
+"""
+import os
+import math
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from su_core import catalog, su_cost_batch
+
+FIELDS = ('node_type', 'node_count', 'cpu', 'gpu', 'ram', 'duration')
+DEFAULTS = {'node_count': 1, 'cpu': 0, 'gpu': 0, 'ram': 0}
+
+def parse_job(spec):
+    """ check one job spec (a dict of FIELDS, node_count, cpu, gpu and ram default to 1, 0, 0, 0) and return it as a tuple in FIELDS order. Raises ValueError. """
+    if not isinstance(spec, dict):
+        raise ValueError("a job must be an object with the fields {}".format(list(FIELDS)))
+    node_type = spec.get('node_type')
+    if node_type not in catalog.index:
+        raise ValueError("unknown node type '{}'. Must be one of {}.".format(node_type, list(catalog.ids)))
+    job = [node_type]
+    for field in FIELDS[1:]:
+        value = spec.get(field, DEFAULTS.get(field))
+        if value is None:
+            raise ValueError("missing field '{}'".format(field))
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError("field '{}' must be a number, not {!r}".format(field, value))
+        if not math.isfinite(value) or value < 0:
+            raise ValueError("field '{}' must be a finite number >= 0, not {!r}".format(field, value))
+        job.append(value)
+    return(tuple(job))
+
+class QuoteBatcher:
+    """ coalesces the jobs of concurrent quote() calls into batched su_cost_batch() calls on a background thread. """
+    def __init__(self, max_batch = 4096, max_wait = 0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self.jobs = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._busy = False # the last batch coalesced several requests
+
+    def _start(self):
+        # the thread is started on first use, and again in a forked gunicorn worker where it does not exist
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target = self._run, name = "su-quote-batcher", daemon = True).start()
+                self._pid = os.getpid()
+
+    def quote(self, jobs, timeout = 10):
+        """ SUs of a list of parse_job() tuples, costed together with the jobs of concurrent callers. """
+        if self._pid != os.getpid():
+            self._start()
+        future = Future()
+        self._queue.put((jobs, future))
+        return(future.result(timeout))
+
+    def _collect(self):
+        """
+        block for the first request, then gather others until max_wait has passed or max_batch jobs are waiting.
+        A lone request after a lone request is costed right away, so quiet periods do not pay max_wait.
+        """
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + (self.max_wait if self._busy or not self._queue.empty() else 0)
+        while size < self.max_batch:
+            try:
+                item = self._queue.get(timeout = max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        self._busy = len(batch) > 1
+        return(batch, size)
+
+    def _run(self):
+        while True:
+            batch, size = self._collect()
+            jobs = [job for request_jobs, future in batch for job in request_jobs]
+            try:
+                su = su_cost_batch(*zip(*jobs)).tolist() if jobs else []
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            start = 0
+            for request_jobs, future in batch:
+                future.set_result(su[start: start + len(request_jobs)])
+                start += len(request_jobs)
+            self.requests += len(batch)
+            self.batches += 1
+            self.jobs += size
+
+    def stats(self):
+        return({"requests": self.requests, "batches": self.batches, "jobs": self.jobs, "max_batch": self.max_batch, "max_wait_ms": self.max_wait * 1000})
+
+def make_batcher():
+    """ build a QuoteBatcher from the SU_QUOTE_* environment variables. """
+    return(QuoteBatcher(int(os.environ.get("SU_QUOTE_BATCH", 4096)), float(os.environ.get("SU_QUOTE_WAIT_MS", 2)) / 1000))
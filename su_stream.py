@@ -0,0 +1,386 @@
+"""
+Cost SLURM accounting dumps or job CSV files from the command line, one chunk at a time.
+
+Examples:
+    sacct -a -X -S 2020-05-01 -E 2020-06-01 --parsable2 -o JobID,Account,User,Partition,AllocNodes,AllocTRES,ElapsedRaw > may.txt
+    python su_stream.py may.txt --output may_jobs.csv --totals may_accounts.csv
+
+    python su_stream.py jobs.csv --format csv
+
+sacct input needs the JobID, Partition, AllocNodes, AllocTRES and ElapsedRaw (or Elapsed) columns. Account and User are optional.
+Job steps (JobIDs containing a ".") are skipped so each job is only costed once.
+CSV input needs the node_type, node_count, cpu, gpu, ram and duration (hours) columns, with cpu/gpu/ram given per node like in the calculator.
+Optional CSV columns are job_id, account and user.
+
+Malformed records (e.g. an unknown node type, a non-numeric AllocNodes or an Elapsed of INVALID) are reported on stderr with their line number
+and skipped. With --strict the first one stops the run.
+
+Only one chunk of jobs plus the per-account totals is held in memory, so input files of any size can be costed.
+With --workers, every file is cut into --shard-size byte ranges that are costed on separate processes and only the totals are reported:
+    python su_stream.py 2019-*.txt --no-jobs --workers 0 --totals 2019_accounts.csv --user-totals 2019_users.csv
+"""
+import os
+import sys
+import csv
+import math
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from su_core import su_cost_batch, su_dollar, catalog
+
+OUTPUT_COLUMNS = ['job_id', 'account', 'user', 'node_type', 'su', 'dollars', 'account_su_total']
+
+# memory suffixes in sacct TRES strings, converted to GB
+MEM_UNITS = {'K': 1 / 1024 ** 2, 'M': 1 / 1024, 'G': 1, 'T': 1024, 'P': 1024 ** 2}
+
+def partition_node_type(partition, partition_map = None):
+    """
+    Node type of a SLURM partition: an explicit mapping, else the partitions listed in the node type catalog, else the catalog's default_node_type.
+    Raises ValueError for partitions that none of them cover.
+    """
+    if partition_map and partition in partition_map:
+        return(partition_map[partition])
+    if partition in catalog.partitions:
+        return(catalog.partitions[partition])
+    if catalog.default_node_type is not None:
+        return(catalog.default_node_type)
+    raise ValueError("partition '{}' is not in the node type catalog. Add it to a node type's partitions or map it with --partition {}=<node type>.".format(partition, partition))
+
+def parse_tres(tres):
+    """ split an AllocTRES string such as 'cpu=28,mem=128G,node=1,gres/gpu=2' into (cpu, gpu, ram in GB) for the whole job. """
+    cpu, gpu, ram = 0.0, 0.0, 0.0
+    for item in tres.split(","):
+        if "=" not in item:
+            continue
+        key, value = item.split("=", 1)
+        if key == "cpu":
+            cpu = float(value)
+        elif key == "gres/gpu":
+            gpu = float(value)
+        elif key == "mem":
+            if value[-1].upper() in MEM_UNITS:
+                ram = float(value[:-1]) * MEM_UNITS[value[-1].upper()]
+            else: # plain number is megabytes
+                ram = float(value) / 1024
+    return(cpu, gpu, ram)
+
+def parse_elapsed(elapsed):
+    """ convert a sacct Elapsed value ([DD-][HH:]MM:SS) to hours. """
+    days = 0
+    if "-" in elapsed:
+        days, elapsed = elapsed.split("-", 1)
+    seconds = 0
+    for part in elapsed.split(":"):
+        seconds = seconds * 60 + float(part)
+    return(int(days) * 24 + seconds / 3600)
+
+def sacct_job(row, partition_map = None):
+    """ turn one sacct --parsable2 record (as a dict) into (job_id, account, user, node_type, node_count, cpu, gpu, ram, duration). Returns None for job steps. """
+    job_id = row['JobID']
+    if "." in job_id:
+        return(None)
+    node_count = float(row['AllocNodes'] or 0)
+    cpu, gpu, ram = parse_tres(row['AllocTRES'])
+    if row.get('ElapsedRaw'):
+        duration = float(row['ElapsedRaw']) / 3600
+    else:
+        duration = parse_elapsed(row['Elapsed'])
+    # su_cost() expects resources per node
+    per_node = node_count if node_count > 0 else 1
+    return(job_id, row.get('Account', ''), row.get('User', ''), partition_node_type(row['Partition'], partition_map),
+        node_count, cpu / per_node, gpu / per_node, ram / per_node, duration)
+
+def csv_job(row, partition_map = None):
+    """ turn one calculator-style CSV record (as a dict) into (job_id, account, user, node_type, node_count, cpu, gpu, ram, duration). """
+    return(row.get('job_id', ''), row.get('account', ''), row.get('user', ''), row['node_type'],
+        float(row['node_count']), float(row['cpu']), float(row['gpu']), float(row['ram']), float(row['duration']))
+
+def check_job(job):
+    """ raise ValueError unless a parsed job has a known node type and finite, non-negative resources and duration. """
+    if job[3] not in catalog.index:
+        raise ValueError("unknown node type '{}'. Must be one of {}.".format(job[3], list(catalog.ids)))
+    for name, value in zip(('node_count', 'cpu', 'gpu', 'ram', 'duration'), job[4:]):
+        if not math.isfinite(value) or value < 0:
+            raise ValueError("{} must be a finite number >= 0, not {}".format(name, value))
+
+def describe(error):
+    """ message of an error raised while parsing one record. """
+    if isinstance(error, KeyError):
+        return("missing column {}".format(error))
+    if isinstance(error, (TypeError, IndexError, AttributeError)):
+        return("missing or empty value")
+    return(str(error))
+
+class SkippedRecords:
+    """ on_error handler that prints the first limit malformed records of each run to stderr and counts all of them. """
+    def __init__(self, limit = 20):
+        self.limit = limit
+        self.count = 0
+        self.source = None # input file the messages belong to, when they do not name it themselves
+
+    def __call__(self, message):
+        self.count += 1
+        if self.count <= self.limit:
+            print("{}{} (skipped)".format(self.source + ": " if self.source else "", message), file = sys.stderr)
+
+    def summary(self):
+        if self.count > self.limit:
+            print("... {} more malformed records skipped".format(self.count - self.limit), file = sys.stderr)
+        if self.count:
+            print("{} malformed records skipped in total".format(self.count), file = sys.stderr)
+
+def detect_format(header):
+    return("sacct" if "|" in header else "csv")
+
+def read_records(handle, fmt = "auto", partition_map = None, header = None, on_error = None, require_id = False):
+    """
+    Lazily yield (raw record dict, parsed job) pairs from an open text file. If header is given, handle is assumed to be positioned past the header line
+    (used when a file is split into several pieces).
+    A record that cannot be parsed, or has no job id when require_id is set, raises ValueError("line <n>: ..."), or is passed to on_error(message) and skipped.
+    Line numbers count the header as line 1 (for a piece of a file, they count from the header line before the piece).
+    """
+    if header is None:
+        header = handle.readline()
+    if fmt == "auto":
+        fmt = detect_format(header)
+    delimiter = "|" if fmt == "sacct" else ","
+    fieldnames = next(csv.reader([header], delimiter = delimiter))
+    parse = sacct_job if fmt == "sacct" else csv_job
+    reader = csv.DictReader(handle, fieldnames = fieldnames, delimiter = delimiter)
+    for row in reader:
+        try:
+            job = parse(row, partition_map)
+            if job is None:
+                continue
+            check_job(job)
+            if require_id and not job[0]:
+                raise ValueError("missing job id")
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError) as error:
+            message = "line {}: {}".format(reader.line_num + 1, describe(error))
+            if on_error is None:
+                raise ValueError(message)
+            on_error(message)
+            continue
+        yield(row, job)
+
+def read_jobs(handle, fmt = "auto", partition_map = None, header = None, on_error = None):
+    """ lazily yield parsed jobs from an open text file, see read_records(). """
+    for row, job in read_records(handle, fmt, partition_map, header, on_error):
+        yield(job)
+
+def chunked(jobs, chunk_size):
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) == chunk_size:
+            yield(chunk)
+            chunk = []
+    if chunk:
+        yield(chunk)
+
+def cost_chunks(jobs, chunk_size = 100000):
+    """ cost parsed jobs chunk by chunk with su_cost_batch(). Yields (chunk, su array) pairs. """
+    for chunk in chunked(jobs, chunk_size):
+        job_id, account, user, node_type, node_count, cpu, gpu, ram, duration = zip(*chunk)
+        yield(chunk, su_cost_batch(node_type, node_count, cpu, gpu, ram, duration))
+
+def add_totals(totals, chunk, su):
+    """ add costed jobs to totals, a dict of {(account, user): [jobs, su]}. """
+    for job, job_su in zip(chunk, su):
+        group = totals.setdefault((job[1], job[2]), [0, 0.0])
+        group[0] += 1
+        group[1] += job_su
+    return(totals)
+
+def merge_totals(totals, other):
+    for group, (jobs, su) in other.items():
+        merged = totals.setdefault(group, [0, 0.0])
+        merged[0] += jobs
+        merged[1] += su
+    return(totals)
+
+def rollup(totals, by = "account"):
+    """ collapse {(account, user): [jobs, su]} to {account: [jobs, su]} or {user: [jobs, su]}. """
+    index = 0 if by == "account" else 1
+    grouped = {}
+    for group in sorted(totals):
+        jobs, su = totals[group]
+        merged = grouped.setdefault(group[index], [0, 0.0])
+        merged[0] += jobs
+        merged[1] += su
+    return(grouped)
+
+def stream(handle, writer = None, fmt = "auto", chunk_size = 100000, partition_map = None, totals = None, on_error = None):
+    """
+    Cost every job in handle, write one output row per job with writer (if given) and return the totals {(account, user): [jobs, su]}.
+    Pass the totals of previous files to keep the running per-account total going across several inputs. See read_records() for on_error.
+    """
+    totals = {} if totals is None else totals
+    account_su = {account: su for account, (jobs, su) in rollup(totals).items()}
+    for chunk, su in cost_chunks(read_jobs(handle, fmt, partition_map, on_error = on_error), chunk_size):
+        su = su.tolist()
+        add_totals(totals, chunk, su)
+        if writer is None:
+            continue
+        for job, job_su in zip(chunk, su):
+            account_su[job[1]] = account_su.get(job[1], 0.0) + job_su
+            writer.writerow([job[0], job[1], job[2], job[3], round(job_su, 4), round(job_su * su_dollar, 4), round(account_su[job[1]], 4)])
+    return(totals)
+
+# parallel mode -------------------------------------------------------------------
+
+def shard_ranges(path, shard_size):
+    """ split a file into (path, start, end, header) byte ranges of about shard_size bytes. Every range is costed by one worker. """
+    assert shard_size > 0, "shard_size must be above 0"
+    with open(path, "rb") as handle:
+        header = handle.readline()
+        size = os.fstat(handle.fileno()).st_size
+    shards = []
+    start = len(header)
+    while start < size:
+        end = min(start + shard_size, size)
+        shards.append((path, start, end, header.decode("utf-8")))
+        start = end
+    return(shards)
+
+def read_byte_range(path, start, end):
+    """ yield the lines of path that start within [start, end). A line crossing end belongs to this range, a line crossing start to the previous one. """
+    with open(path, "rb") as handle:
+        # the header is always before start, so start - 1 exists. Skip to the first line beginning at or after start.
+        handle.seek(start - 1)
+        position = start - 1 + len(handle.readline())
+        while position < end:
+            line = handle.readline()
+            if not line:
+                break
+            position += len(line)
+            yield(line.decode("utf-8"))
+
+def cost_shard(shard, fmt = "auto", chunk_size = 100000, partition_map = None):
+    """ worker: cost one byte range and return its totals {(account, user): [jobs, su]} and the messages of its malformed records. """
+    path, start, end, header = shard
+    totals, errors = {}, []
+    # line numbers count from the start of the shard, so every message names the shard's first byte
+    on_error = lambda message: errors.append("{} (shard from byte {}), {}".format(path, start, message))
+    for chunk, su in cost_chunks(read_jobs(read_byte_range(path, start, end), fmt, partition_map, header = header, on_error = on_error), chunk_size):
+        add_totals(totals, chunk, su.tolist())
+    return(totals, errors)
+
+def parallel_totals(paths, workers = None, fmt = "auto", chunk_size = 100000, partition_map = None, shard_size = 64 * 1024 ** 2, on_error = None):
+    """
+    Cost files on a pool of worker processes (all cores if workers is None) and return the merged totals {(account, user): [jobs, su]}.
+    Shards only depend on shard_size and are merged in file order, so the totals are identical for any number of workers.
+    Malformed records are passed to on_error(message), or raise ValueError once the shard holding the first one is merged.
+    """
+    shards = [shard for path in paths for shard in shard_ranges(path, shard_size)]
+    args = (shards, itertools.repeat(fmt), itertools.repeat(chunk_size), itertools.repeat(partition_map))
+    totals = {}
+    def merge(results):
+        for shard_totals, errors in results:
+            for message in errors:
+                if on_error is None:
+                    raise ValueError(message)
+                on_error(message)
+            merge_totals(totals, shard_totals)
+    if workers == 1:
+        merge(map(cost_shard, *args))
+        return(totals)
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        merge(pool.map(cost_shard, *args))
+    return(totals)
+
+# command line --------------------------------------------------------------------
+
+def write_totals(totals, out, by = "account"):
+    writer = csv.writer(out)
+    writer.writerow([by, 'jobs', 'su', 'dollars'])
+    for group, (jobs, su) in rollup(totals, by).items():
+        writer.writerow([group, jobs, round(su, 4), round(su * su_dollar, 2)])
+
+def parse_partition_map(pairs):
+    partition_map = {}
+    for pair in pairs:
+        partition, node_type = pair.split("=", 1)
+        if node_type not in catalog.rates:
+            raise ValueError("unknown node type '{}' for partition '{}'. Must be one of {}.".format(node_type, partition, list(catalog.ids)))
+        partition_map[partition] = node_type
+    return(partition_map)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs = "+", help = "sacct --parsable2 dump(s) or CSV file(s), '-' for stdin")
+    parser.add_argument("--format", choices = ["auto", "sacct", "csv"], default = "auto", help = "input format (default: guessed from the header line)")
+    parser.add_argument("--output", default = "-", help = "per-job output CSV, '-' for stdout (default)")
+    parser.add_argument("--no-jobs", action = "store_true", help = "do not write per-job rows, only the totals")
+    parser.add_argument("--totals", default = None, help = "per-account totals CSV (default: stderr)")
+    parser.add_argument("--user-totals", default = None, help = "also write per-user totals to this CSV")
+    parser.add_argument("--chunk-size", type = int, default = 100000, help = "number of jobs costed per batch (default: 100000)")
+    parser.add_argument("--partition", action = "append", default = [], metavar = "NAME=TYPE", help = "map a sacct partition to a node type of the catalog (e.g. std, gpu or fat). Repeatable.")
+    parser.add_argument("--workers", type = int, default = 1, help = "number of worker processes, 0 for all cores (default: 1). More than one worker only computes totals and needs --no-jobs.")
+    parser.add_argument("--shard-size", type = int, default = 64, help = "size in MB of the file pieces handed to each worker (default: 64)")
+    parser.add_argument("--strict", action = "store_true", help = "stop at the first malformed record instead of skipping it")
+    return(parser)
+
+def open_text(path, mode):
+    if path == "-":
+        return(sys.stdin if mode == "r" else sys.stdout)
+    return(open(path, mode, newline = ""))
+
+def main(argv = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        partition_map = parse_partition_map(args.partition)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.workers < 0:
+        parser.error("--workers must be 0 (all cores) or more")
+    if args.shard_size < 1:
+        parser.error("--shard-size must be at least 1 MB")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    skipped = None if args.strict else SkippedRecords()
+    if args.workers != 1:
+        if not args.no_jobs:
+            parser.error("--workers other than 1 only computes totals, add --no-jobs")
+        if "-" in args.input:
+            parser.error("--workers other than 1 cannot read from stdin")
+        try:
+            totals = parallel_totals(args.input, args.workers or None, args.format, args.chunk_size, partition_map, args.shard_size * 1024 ** 2, skipped)
+        except ValueError as error:
+            parser.error(str(error))
+    else:
+        out = None if args.no_jobs else open_text(args.output, "w")
+        writer = None
+        if out is not None:
+            writer = csv.writer(out)
+            writer.writerow(OUTPUT_COLUMNS)
+        totals = {}
+        try:
+            for path in args.input:
+                handle = open_text(path, "r")
+                if skipped is not None:
+                    skipped.source = path
+                try:
+                    stream(handle, writer, args.format, args.chunk_size, partition_map, totals, skipped)
+                except ValueError as error:
+                    parser.error("{}: {}".format(path, error))
+                finally:
+                    if handle is not sys.stdin:
+                        handle.close()
+        finally:
+            if out is not None and out is not sys.stdout:
+                out.close()
+    if skipped is not None:
+        skipped.summary()
+    if args.totals is None:
+        write_totals(totals, sys.stderr)
+    else:
+        with open(args.totals, "w", newline = "") as totals_out:
+            write_totals(totals, totals_out)
+    if args.user_totals is not None:
+        with open(args.user_totals, "w", newline = "") as totals_out:
+            write_totals(totals, totals_out, by = "user")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+What-if sweeps: SUs of every combination of node type x CPU x GPU x RAM x duration on a grid.
+
+SUs are node_count * (share * node factor) * su_per_node_hour * duration, where share = max(cpu / total cpu, gpu / total gpu, ram / total ram)
+only depends on the node type and the resources. A SweepCube therefore computes that weighted share once per (node type, cpu, gpu, ram)
+and multiplies the durations in when a slice is read. Heatmaps and line charts are cut from the same cube without recomputing it,
+and a sweep of 10^7 cells holds only 1 / len(duration) of them in memory. Values are identical to su_cost() on the same job.
+
+Examples:
+    python su_sweep.py --ram 4:1024:4 --duration 1:48 --x ram --y node_type --cpu 1 --hours 24
+    python su_sweep.py --cpu 1:56 --gpu 0:4 --ram 4:1024:4 --duration 1:168 --output sweep.npy
+
+Axis values are written as "start:stop" or "start:stop:step" (stop included) or as a comma separated list.
+--output writes the whole cube to a .npy file (axes in AXES order) one block at a time, so it never has to fit in memory.
+"""
+import sys
+import argparse
+import numpy as np
+from su_core import catalog, su_dollar
+
+AXES = ('node_type', 'cpu', 'gpu', 'ram', 'duration')
+max_share_cells = 10 ** 7 # node types x cpu x gpu x ram values kept in memory
+max_slice_cells = 10 ** 7 # cells slice() may return, use chunks() or write() for more
+
+def parse_axis(text):
+    """ "1:28" (stop included), "4:1024:4" or "4,8,16" -> sorted tuple of floats. Raises ValueError. """
+    text = str(text).strip()
+    try:
+        parts = [float(part) for part in text.split(":" if ":" in text else ",") if part.strip()]
+    except ValueError:
+        raise ValueError("axis '{}' must be start:stop, start:stop:step or a comma separated list of numbers".format(text))
+    if ":" in text:
+        if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] <= 0):
+            raise ValueError("axis '{}' must be start:stop or start:stop:step with a step above 0".format(text))
+        start, stop, step = parts[0], parts[1], parts[2] if len(parts) == 3 else 1.0
+        if (stop - start) / step >= max_share_cells:
+            raise ValueError("axis '{}' has more than {} values".format(text, max_share_cells))
+        values = np.arange(start, stop + step / 2, step) if stop >= start else np.array([])
+    else:
+        values = np.array(parts)
+    if len(values) == 0 or not np.all(np.isfinite(values)) or np.any(values < 0):
+        raise ValueError("axis '{}' must hold at least one finite value >= 0".format(text))
+    return(tuple(np.unique(values).tolist()))
+
+class SweepCube:
+    """
+    SUs of node_count nodes over a node_types x cpu x gpu x ram x duration grid. Read it with slice(), chunks() or write().
+    max_cells caps the node type x cpu x gpu x ram combinations held in memory (8 bytes each).
+    """
+    def __init__(self, node_types, cpu, gpu, ram, duration, node_count = 1, max_cells = max_share_cells):
+        unknown = [node_type for node_type in node_types if node_type not in catalog.index]
+        if unknown:
+            raise ValueError("unknown node type(s) {}. Must be one of {}.".format(unknown, list(catalog.ids)))
+        self.axes = {
+            'node_type': tuple(node_types),
+            'cpu': np.asarray(cpu, dtype = float),
+            'gpu': np.asarray(gpu, dtype = float),
+            'ram': np.asarray(ram, dtype = float),
+            'duration': np.asarray(duration, dtype = float)}
+        self.node_count = float(node_count)
+        self.shape = tuple(len(self.axes[axis]) for axis in AXES)
+        self.size = int(np.prod(self.shape))
+        if self.size // self.shape[-1] > max_cells:
+            raise ValueError("sweep of {} node type/cpu/gpu/ram combinations is above the limit of {}".format(self.size // self.shape[-1], max_cells))
+        # share * node factor of every (node type, cpu, gpu, ram), built one node type at a time so the only temporary is one node type's block
+        cpu, gpu, ram = self.axes['cpu'][:, None, None], self.axes['gpu'][None, :, None], self.axes['ram'][None, None, :]
+        self.weighted_share = np.empty(self.shape[:-1])
+        for position, node_type in enumerate(node_types):
+            node_factor, inv_cpu, inv_gpu, inv_ram = catalog.rates[node_type]
+            block = self.weighted_share[position]
+            np.maximum(cpu * inv_cpu, gpu * inv_gpu, out = block)
+            np.maximum(block, ram * inv_ram, out = block)
+            block *= node_factor
+
+    def position(self, axis, value):
+        """ position of value on an axis: the node type itself, or the nearest grid value. """
+        if axis == 'node_type':
+            return(self.axes[axis].index(value))
+        return(int(np.abs(self.axes[axis] - float(value)).argmin()))
+
+    def slice(self, units = "units_su", **fixed):
+        """
+        SUs (or dollars) with the axes named in fixed held at a grid position, e.g. slice(cpu = 0, gpu = 0, duration = 3) is a node_type x ram matrix.
+        A python slice keeps part of an axis, e.g. ram = slice(None, None, 4) for every 4th value. The remaining axes are kept in AXES order.
+        Raises ValueError above max_slice_cells.
+        """
+        unknown = set(fixed) - set(AXES)
+        if unknown:
+            raise ValueError("unknown sweep axis {}. Must be one of {}.".format(sorted(unknown), list(AXES)))
+        index = tuple(fixed.get(axis, slice(None)) for axis in AXES)
+        cells = 1
+        for position, count in zip(index, self.shape):
+            if isinstance(position, slice):
+                cells *= len(range(*position.indices(count)))
+        if cells > max_slice_cells:
+            raise ValueError("slice of {} cells is above the limit of {}".format(cells, max_slice_cells))
+        weighted_share = self.weighted_share[index[:-1]]
+        duration = self.axes['duration'][index[-1]]
+        # same operation order as su_cost() so results match bit for bit
+        su = np.multiply.outer(self.node_count * weighted_share * catalog.su_per_node_hour, duration)
+        return(su * su_dollar if units == "units_dollars" else su)
+
+    def chunks(self, max_cells = 2 ** 20):
+        """ yield (node type position, cpu slice, SUs of shape (cpu positions, gpu, ram, duration)) blocks of at most about max_cells cells. """
+        per_cpu = max(1, self.size // (self.shape[0] * self.shape[1]))
+        step = max(1, max_cells // per_cpu)
+        for node_position in range(self.shape[0]):
+            for start in range(0, self.shape[1], step):
+                cpu_slice = slice(start, min(start + step, self.shape[1]))
+                yield(node_position, cpu_slice, self.slice(node_type = node_position, cpu = cpu_slice))
+
+    def write(self, path, max_cells = 2 ** 20):
+        """ write the whole cube to a .npy file chunk by chunk. """
+        out = np.lib.format.open_memmap(path, mode = "w+", dtype = float, shape = self.shape)
+        for node_position, cpu_slice, block in self.chunks(max_cells):
+            out[node_position, cpu_slice] = block
+        out.flush()
+        del out
+
+# command line --------------------------------------------------------------------
+
+def axis_label(axis, value):
+    return(value if axis == 'node_type' else "{:g}".format(value))
+
+def build_parser():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--node-types", nargs = "+", default = list(catalog.ids), help = "node types to sweep (default: all)")
+    parser.add_argument("--cpu", default = "1", help = "CPUs per node (default: 1)")
+    parser.add_argument("--gpu", default = "0", help = "GPUs per node (default: 0)")
+    parser.add_argument("--ram", default = "4", help = "RAM per node in GB (default: 4)")
+    parser.add_argument("--duration", default = "1", help = "job duration in hours (default: 1)")
+    parser.add_argument("--nodes", type = float, default = 1, help = "number of nodes (default: 1)")
+    parser.add_argument("--units", choices = ["units_su", "units_dollars"], default = "units_su")
+    parser.add_argument("--x", choices = AXES, default = None, help = "print a table with this axis as columns")
+    parser.add_argument("--y", choices = AXES, default = 'node_type', help = "rows of the printed table (default: node_type)")
+    for axis in AXES:
+        parser.add_argument("--" + axis.replace("_", "-") + "-at", dest = axis + "_at", default = None, help = "{} the table is cut at (default: first value)".format(axis))
+    parser.add_argument("--hours", dest = "duration_at", default = None, help = "same as --duration-at")
+    parser.add_argument("--output", default = None, help = "write the whole cube to this .npy file")
+    return(parser)
+
+def main(argv = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        cube = SweepCube(args.node_types, parse_axis(args.cpu), parse_axis(args.gpu), parse_axis(args.ram), parse_axis(args.duration), args.nodes)
+        fixed = {axis: cube.position(axis, getattr(args, axis + "_at")) for axis in AXES if getattr(args, axis + "_at") is not None}
+    except ValueError as error:
+        parser.error(str(error))
+    print("{} cells {}".format(cube.size, dict(zip(AXES, cube.shape))), file = sys.stderr)
+    if args.output:
+        cube.write(args.output)
+    if args.x:
+        if args.x == args.y:
+            parser.error("--x and --y must be different axes")
+        for axis in AXES:
+            if axis not in (args.x, args.y):
+                fixed.setdefault(axis, 0)
+        fixed.pop(args.x, None)
+        fixed.pop(args.y, None)
+        table = cube.slice(args.units, **fixed)
+        if AXES.index(args.y) > AXES.index(args.x):
+            table = table.T
+        print("\t".join([args.y + "\\" + args.x] + [axis_label(args.x, value) for value in cube.axes[args.x]]))
+        for value, row in zip(cube.axes[args.y], table):
+            print("\t".join([axis_label(args.y, value)] + ["{:.6g}".format(su) for su in row]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# registration tests of the Dash callbacks in both callback modes. run with `python -m pytest`.
+import sys
+import importlib
+import pytest
+
+# input values that make the callbacks do real work instead of returning their empty state
+overrides = {
+    "node_type.value": "std",
+    "input_budget.value": 100,
+    "input_view.n_clicks": 1,
+    "input_readme.n_clicks": 1,
+    "input_workflow_add.n_clicks": 1,
+    "input_sweep.n_clicks": 1,
+    "intermediate_cost.children": 140.0,
+    "input_workflow.data": [{"stage": "align", "node_type": "std", "node_count": 1, "cpu": 14, "gpu": 0, "ram": 32, "duration": 10, "count": 2}],
+}
+
+def layout_values(node, values):
+    """ "id.property" -> value of every component in the /_dash-layout tree. """
+    if isinstance(node, list):
+        for child in node:
+            layout_values(child, values)
+    elif isinstance(node, dict) and "props" in node:
+        props = node["props"]
+        for name, value in props.items():
+            if "id" in props:
+                values["{}.{}".format(props["id"], name)] = value
+        layout_values(props.get("children"), values)
+    return(values)
+
+def callback_body(dependency, values):
+    def prop(item):
+        key = "{}.{}".format(item["id"], item["property"])
+        return({"id": item["id"], "property": item["property"], "value": overrides.get(key, values.get(key))})
+    outputs = [dict(zip(("id", "property"), output.rsplit(".", 1))) for output in dependency["output"].strip(".").split("...")]
+    return({
+        "output": dependency["output"],
+        "outputs": outputs if dependency["output"].startswith("..") else outputs[0],
+        "inputs": [prop(item) for item in dependency["inputs"]],
+        "state": [prop(item) for item in dependency["state"]],
+        "changedPropIds": ["{}.{}".format(item["id"], item["property"]) for item in dependency["inputs"][:1]],
+    })
+
+@pytest.fixture(params = ["server", "client"])
+def client(request, monkeypatch):
+    monkeypatch.setenv("SU_CALLBACKS", request.param)
+    monkeypatch.setenv("SU_CACHE", "off")
+    sys.modules.pop("app", None)
+    app = importlib.import_module("app")
+    yield app.server.test_client()
+    sys.modules.pop("app", None)
+
+def test_every_callback_answers(client):
+    dependencies = client.get("/_dash-dependencies")
+    assert dependencies.status_code == 200
+    values = layout_values(client.get("/_dash-layout").get_json(), {})
+    server_callbacks = [dependency for dependency in dependencies.get_json() if not dependency.get("clientside_function")]
+    assert server_callbacks
+    for dependency in server_callbacks:
+        response = client.post("/_dash-update-component", json = callback_body(dependency, values))
+        assert response.status_code in (200, 204), (dependency["output"], response.data[:300])
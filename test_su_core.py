@@ -0,0 +1,49 @@
+# unit tests of the SU formula. run with `python -m pytest`.
+from su_core import su_cost, su_budget, su_cost_batch, su_workflow
+
+examples = [('std', 1, 14, 0, 32, 10), ('std', 1, 7, 1, 128, 10), ('gpu', 1, 1, 3, 16, 10), ('fat', 1, 42, 0, 512, 10), ('fat', 1, 4, 0, 2048, 10), ('std', 16, 28, 0, 128, 10)]
+
+def test_readme_examples():
+    # Example 1 (CPU driven SU): User A submits a job that is allocated 14 cores and 32 GB of RAM on one standard compute node.  Each compute node has a total of 28 cores and 128GB of RAM.  The job runs for 10 hours.  The job would have consumed
+    assert su_cost('std', 1, 14, 0, 32, 10) == 140.0, "1 standard node using 14 cores and 28 GB RAM for 10 hrs does not equal 140 service units"
+
+    # Example 2 (Memory driven SU): User B submits a job that is allocated 7 cores and 128GB of RAM and one GPU on a GPU node. Each GPU node has a total of 28 cores and 256GB of RAM and 4 GPUs.  The job runs for 10 hours. Then the job would have consumed
+    assert su_cost('std', 1, 7, 1, 128, 10) == 280.0, "1 standard node using 7 cores and 128 GB RAM for 10 hrs does not equal 280 service units" # accommodate one gpu core
+
+    # Example 3 (GPU driven SU): User C submits a job to the GPU partition and that job is allocated 1 core, 16GB of RAM, and 3 GPUs. The nodes in the GPU partition have 28 cpus, 256 GB of RAM, and 4 GPUs. This job runs for 10 hours and will have consumed
+    assert su_cost('gpu', 1, 1, 3, 16, 10) == 420.0, "1 gpu node using 1 core, 3 GPUs and 16 GB RAM for 10 hrs does not equal 420 service units"
+
+    # Example 4 (CPU driven SU on Fat nodes): User D submits a job to the fat partition that is allocated 42 of the 56 available cpus and 512GB of memory.  The job finishes in 10 hours and will have consumed
+    assert su_cost('fat', 1, 42, 0, 512, 10) == 1260, "1 fat node using 42 cores and 512 GB RAM for 10 hrs does not equal 1260 service units"
+
+    # Example 5 (Memory driven SU on Fat nodes): User E submits a job to the fat partition that is allocated 4 of the 56 available cpus and 2TB (2048GB) of memory.  The job finishes in 10 hours and will have consumed
+    assert su_cost('fat', 1, 4, 0, 2048, 10) == 3360.0, "1 fat node using 4 cores and 2048 GB RAM for 10 hrs does not equal 3360 service units"
+
+    # Example 6 (Multiple standard nodes): User F submits a job that is allocated 16 standard nodes (28 cores and 128 GB of RAM per node, totaling 448 cores and 2048GB of memory).  The job runs for 10 hours and will have consumed
+    assert su_cost('std', 16, 28, 0, 128, 10) == 4480.0, "16 std nodes using 28 cores and 128 GB RAM for 10 hrs does not equal 4480 service units"
+
+def test_batch_matches_su_cost():
+    # batch calculation must agree with su_cost() on all of the README examples
+    assert list(su_cost_batch(*zip(*examples))) == [su_cost(*job) for job in examples], "su_cost_batch does not match su_cost on the README examples"
+
+def test_budget_inverts_su_cost():
+    # Example 1 backwards: 140 SU buys 10 hours of 14 cores on a standard node, and the unused share of the node (ram) comes free. Standard nodes have no GPUs.
+    plan, = su_budget(140, node_type = 'std', min_cpu = 14, min_ram = 32)
+    assert (plan['cpu'], plan['gpu'], plan['ram'], plan['hours'], plan['hours_full_node']) == (14, 0, 64.0, 10.0, 5.0)
+    # only node types with GPUs installed are offered for GPU jobs
+    assert {plan['node_type'] for plan in su_budget(1000, min_gpu = 1)} == {'gpu'}
+    # every plan spends exactly the budget
+    for plan in su_budget(1000, min_cpu = 7, min_gpu = 1, min_ram = 100, max_nodes = 4):
+        assert abs(su_cost(plan['node_type'], plan['node_count'], plan['cpu'], plan['gpu'], plan['ram'], plan['hours']) - 1000) < 1e-9
+    # explicit node counts instead of a range, e.g. the few rows the app lists for a large node count
+    assert [plan['node_count'] for plan in su_budget(1000, node_type = 'std', node_counts = [1, 100, 10**6])] == [1, 100, 10**6]
+    # jobs that do not fit on one node are left out
+    assert [plan['node_type'] for plan in su_budget(1000, min_cpu = 40)] == ['fat']
+
+def test_workflow_stages():
+    # README examples 1, 3 and 5 as a pipeline: 10 alignment jobs, then an assembly and a training stage
+    jobs = [dict(zip(('node_type', 'node_count', 'cpu', 'gpu', 'ram', 'duration'), examples[i]), stage = stage, count = count) for i, stage, count in [(0, 'align', 10), (4, 'assembly', 1), (2, 'train', 1), (0, 'align', 1)]]
+    su, stages, total = su_workflow(jobs)
+    assert list(su) == [1400.0, 3360.0, 420.0, 140.0]
+    assert [(stage['stage'], stage['jobs'], stage['su']) for stage in stages] == [('align', 11, 1540.0), ('assembly', 1, 3360.0), ('train', 1, 420.0)]
+    assert total == 5320.0
@@ -0,0 +1,43 @@
+# unit tests of the usage ledger. run with `python -m pytest`.
+import io
+import pytest
+from su_ledger import Ledger
+
+SACCT = """JobID|Account|User|Partition|AllocNodes|AllocTRES|ElapsedRaw|End
+100|labA|amy|short|1|billing=14,cpu=14,mem=32G,node=1|36000|2020-05-03T10:00:00
+100.batch|labA|amy|short|1|cpu=14,mem=32G,node=1|36000|2020-05-03T10:00:00
+101|labB|bob|gpu|1|cpu=1,gres/gpu=3,mem=16G,node=1|36000|2020-05-31T23:00:00
+102|labA|amy|fat|1|cpu=4,mem=2T,node=1|36000|2020-06-01T01:00:00
+103|labB|bob|long|16|cpu=448,mem=2048G,node=16|36000|Unknown
+"""
+
+def test_ingest_is_incremental(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    # job steps and running jobs are skipped, a second ingest of the same dump adds nothing
+    assert ledger.ingest(io.StringIO(SACCT)) == 3
+    assert Ledger(str(tmp_path)).ingest(io.StringIO(SACCT)) == 0
+    assert ledger.months() == ['2020-05', '2020-06']
+    # README examples 1, 3 and 5
+    assert ledger.rollup() == {'labA': [2, 3500.0], 'labB': [1, 420.0]}
+    assert ledger.rollup(['2020-05'], by = 'partition') == {'short': [1, 140.0], 'gpu': [1, 420.0]}
+    assert list(ledger.read(['2020-06'], columns = ('user', 'su'))['user']) == ['amy']
+    # nothing to re-cost while the catalog is unchanged
+    assert ledger.recost() == 0
+
+CSV = """account,user,node_type,node_count,cpu,gpu,ram,duration,month
+a,amy,std,1,14,0,32,10,2020-05
+a,amy,std,1,28,0,64,10,2020-05
+b,bob,gpu,1,1,3,16,10,2020-05
+"""
+
+def test_csv_needs_job_ids(tmp_path):
+    # without a job_id column every row would share the id '' and all but the first job of a month would be dropped as duplicates
+    errors = []
+    assert Ledger(str(tmp_path)).ingest(io.StringIO(CSV), on_error = errors.append) == 0
+    assert errors == ['line 2: missing job id', 'line 3: missing job id', 'line 4: missing job id']
+    with pytest.raises(ValueError, match = "line 2: missing job id"):
+        Ledger(str(tmp_path)).ingest(io.StringIO(CSV))
+    with_ids = "job_id," + CSV.replace("\na,", "\n1,a,", 1).replace("\na,", "\n2,a,", 1).replace("\nb,", "\n3,b,", 1)
+    ledger = Ledger(str(tmp_path))
+    assert ledger.ingest(io.StringIO(with_ids)) == 3
+    assert ledger.rollup() == {'a': [2, 420.0], 'b': [1, 420.0]}
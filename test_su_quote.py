@@ -0,0 +1,20 @@
+# unit tests of the batched pricing API helpers. run with `python -m pytest`.
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from su_core import su_cost
+from su_quote import QuoteBatcher, parse_job
+
+def test_parse_job():
+    assert parse_job({'node_type': 'std', 'cpu': '14', 'ram': 32, 'duration': 10}) == ('std', 1.0, 14.0, 0.0, 32.0, 10.0)
+    for spec in [{'node_type': 'xyz', 'duration': 1}, {'node_type': 'std'}, {'node_type': 'std', 'duration': -1}, {'node_type': 'std', 'duration': 'nan'}, ['std']]:
+        with pytest.raises(ValueError):
+            parse_job(spec)
+
+def test_concurrent_quotes_are_batched():
+    # every caller gets its own jobs back, costed exactly like su_cost()
+    batcher = QuoteBatcher(max_wait = 0.01)
+    requests = [[('std', 1.0, float(cpu), 0.0, 4.0, 2.5)] * (cpu % 3 + 1) for cpu in range(1, 29)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(batcher.quote, requests))
+    assert results == [[su_cost(*job) for job in jobs] for jobs in requests]
+    assert batcher.stats()['requests'] == len(requests) and batcher.stats()['batches'] < len(requests)
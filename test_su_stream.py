@@ -0,0 +1,25 @@
+# unit tests of the command line costing of sacct dumps. run with `python -m pytest`.
+import io
+import pytest
+from su_stream import read_jobs, stream
+
+SACCT = """JobID|Account|User|Partition|AllocNodes|AllocTRES|Elapsed
+1|labA|amy|short|1|cpu=14,mem=32G|10:00:00
+2|labA|amy|short|x|cpu=14,mem=32G|10:00:00
+3|labA|amy|short|1|cpu=14,mem=32G|INVALID
+4|labB|bob|nowhere|1|cpu=1|01:00:00
+5|labB|bob|fat|1|cpu=4,mem=2T|10:00:00
+"""
+
+def test_malformed_records_are_skipped_with_line_numbers():
+    errors = []
+    totals = stream(io.StringIO(SACCT), on_error = errors.append)
+    # README examples 1 and 5 are costed, the other records are reported
+    assert totals == {('labA', 'amy'): [1, 140.0], ('labB', 'bob'): [1, 3360.0]}
+    assert [message.split(":")[0] for message in errors] == ['line 3', 'line 4', 'line 5']
+    # without on_error the first malformed record stops the run
+    with pytest.raises(ValueError, match = "line 3"):
+        list(read_jobs(io.StringIO(SACCT)))
+    # an unknown node type in CSV input is caught before su_cost_batch() sees the chunk
+    with pytest.raises(ValueError, match = "line 2: unknown node type"):
+        list(read_jobs(io.StringIO("node_type,node_count,cpu,gpu,ram,duration\nxyz,1,1,0,4,1\n")))
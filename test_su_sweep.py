@@ -0,0 +1,32 @@
+# unit tests of the what-if sweep. run with `python -m pytest`.
+import itertools
+import pytest
+import numpy as np
+from su_core import su_cost
+from su_sweep import SweepCube, parse_axis
+
+def test_parse_axis():
+    assert parse_axis("1:4") == (1.0, 2.0, 3.0, 4.0)
+    assert parse_axis("4:16:4") == (4.0, 8.0, 12.0, 16.0)
+    assert parse_axis("64, 4,16") == (4.0, 16.0, 64.0)
+
+def test_cube_matches_su_cost(tmp_path):
+    cube = SweepCube(['std', 'gpu', 'fat'], parse_axis("1,7,14,42"), parse_axis("0:3"), parse_axis("16,32,128,512,2048"), parse_axis("1,10"), node_count = 2)
+    expected = np.array([su_cost(*job) for job in itertools.product(['std', 'gpu', 'fat'], [2], *(cube.axes[axis] for axis in ('cpu', 'gpu', 'ram', 'duration')))]).reshape(cube.shape)
+    assert np.array_equal(cube.slice(), expected)
+    # slices hold the other axes at a grid position and keep the free axes in order
+    assert np.array_equal(cube.slice(cpu = 1, gpu = 0, duration = 1), expected[:, 1, 0, :, 1])
+    assert cube.position('ram', 100) == 2 and cube.position('node_type', 'fat') == 2
+    # the chunked .npy export holds the same cube
+    cube.write(str(tmp_path / "sweep.npy"), max_cells = 50)
+    assert np.array_equal(np.load(str(tmp_path / "sweep.npy")), expected)
+
+def test_slice_limit():
+    # the cube itself is small, but a full ram x duration slice would not fit in memory
+    cube = SweepCube(['std'], [1], [0], parse_axis("1:4000"), parse_axis("1:4000"))
+    with pytest.raises(ValueError):
+        cube.slice()
+    assert cube.slice(ram = slice(None, None, 100), duration = slice(None, None, 100)).shape == (1, 1, 1, 40, 40)
+    # the app holds cubes to a lower limit than the command line
+    with pytest.raises(ValueError, match = "above the limit of 1000"):
+        SweepCube(['std', 'gpu'], parse_axis("1:28"), [0], parse_axis("1:20"), [1], max_cells = 1000)